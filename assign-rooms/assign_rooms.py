@@ -56,20 +56,71 @@
 # be both an individual room and a team room. The string should be formatted
 # as follows: "[BUILDING]^[ROOM NAME/NUMBER]"
 
+# ENGINE: it must be either "greedy" (the default), "flow" or "partition".
+# See the top of `flow_assign.py` for how the flow engine works, and the top
+# of `partition_rooms.py` for the partition engine.
+
+# BUDGET: the number of seconds the flow engine may run before we fall back
+# to the greedy passes.
+
+# PREVIOUS_ASSIGNMENTS_CSV: a `room_assignments.csv` produced by an earlier
+# run. When it is passed in, the previous assignment is repaired instead of
+# recomputed; see the top of `repair_rooms.py`. Without INDIV_ROOM, the
+# individuals stay in their previous room.
+
+# CACHE: either "on" (the default), "off" or "clear". When it is on, parsed
+# inputs and finished assignments are cached under the work directory, and a
+# run with the same inputs and options as an earlier one reuses its result;
+# clear empties the cache first. See the top of `cache_rooms.py`.
+
+# AWARDS_POLICY: either "spread" (the default) or "bestfit". Spread hands the
+# awards rooms out round-robin, so the top organizations are spread across
+# all of them; bestfit packs the largest organizations first, each into the
+# room with the least free space that still fits it. Bestfit succeeds with
+# tighter awards capacity, but since guts rooms are smaller than awards
+# rooms, fewer organizations then stay in their awards room for guts.
+
+# LOCAL_SEARCH_BUDGET: the number of seconds to spend improving the finished
+# assignment (0, the default, skips it). See the top of `improve_rooms.py`.
+
+# RESTARTS: the number of seeded local searches to run side by side within
+# that budget.
+
+# WORKERS: the number of clusters the partition engine splits the
+# tournament into, each solved in its own process; the number of CPUs by
+# default.
+
+# PROFILE: either "off" (the default), "on" or "cprofile". When it is not off,
+# the time spent in every phase and the work done by the greedy passes are
+# written to `room_assignments_profile.json`; see the top of
+# `profile_rooms.py`. It can also be passed in as --profile.
+
+# OUTPUTS: extra outputs to write next to `room_assignments.csv`, delimited
+# by a "^": "rosters" for per-room and per-building rosters of every round,
+# and "jsonl" for the same rows as JSON Lines. See the top of
+# `export_rooms.py`.
+
 
 ###########
 # Imports #
 ###########
 
 
+import cProfile
+import copy
 import csv
+import heapq
 import sys
 import os
-from operator import itemgetter
+import time
+from operator import attrgetter, itemgetter
 
 sys.path.append("..")
 from user import UserInfo
 
+import profile_rooms
+from profile_rooms import count_work
+
 
 ###########
 # Globals #
@@ -87,7 +138,16 @@ default = {
     "powerindices": "powerindices.csv",
     "rooms": "rooms.csv",
     "month": "feb",
-    "indiv_room": "10^250"
+    "indiv_room": "10^250",
+    "engine": "greedy",
+    "budget": "10",
+    "cache": "on",
+    "awards_policy": "spread",
+    "local_search": "0",
+    "restarts": "4",
+    "workers": None,
+    "profile": "off",
+    "outputs": ""
 }
 
 passed_in = {
@@ -96,9 +156,29 @@ passed_in = {
     "powerindices": None,
     "rooms": None,
     "month": None,
-    "indiv_room": None
+    "indiv_room": None,
+    "engine": None,
+    "budget": None,
+    "previous": None,
+    "cache": None,
+    "awards_policy": None,
+    "local_search": None,
+    "restarts": None,
+    "workers": None,
+    "profile": None,
+    "outputs": None
 }
 
+engines = ["greedy", "flow", "partition"]
+
+cache_modes = ["on", "off", "clear"]
+
+awards_policies = ["spread", "bestfit"]
+
+profiles = ["off", "on", "cprofile"]
+
+extra_outputs = ["rosters", "jsonl"]
+
 individual_org_name = "Individuals"
 
 room_assignment_headers = ["orgid", "teamid", "teamname", "shortname",
@@ -106,9 +186,95 @@ room_assignment_headers = ["orgid", "teamid", "teamname", "shortname",
                            "indbuilding", "indroom", "gutsbuilding",
                            "gutsroom", "awardsbuilding", "awardsroom"]
 
-# in relation to room_assignment_headers: get earlier indices from
-# team objects and later indices from organization objects
-team_org_split = 6
+
+###########
+# Records #
+###########
+
+
+# compact records for the objects the assignment passes touch over and over;
+#   rooms and buildings are identified by their position in the `rooms` and
+#   `buildings` lists, and rooms are referenced directly instead of through
+#   "[BUILDING] [NUMBER]" string keys
+
+
+class Team:
+    __slots__ = ["orgid", "teamid", "teamname", "shortname", "powerindex",
+                 "teamroom"]
+
+    def __init__(self, orgid, teamid, teamname, shortname):
+        self.orgid = orgid
+        self.teamid = teamid
+        self.teamname = teamname
+        self.shortname = shortname
+
+        # only set for the teams listed in the power indices file
+        self.powerindex = None
+
+        self.teamroom = None
+
+
+class Organization:
+    __slots__ = ["orgid", "orgname", "teams", "number_of_teams", "powerindex",
+                 "indroom", "teamrooms", "teamroomset", "unplaced",
+                 "gutsroom", "awardsroom"]
+
+    def __init__(self, orgid, orgname, teams, powerindex):
+        self.orgid = orgid
+        self.orgname = orgname
+        self.teams = teams
+        self.number_of_teams = len(teams)
+        self.powerindex = powerindex
+        self.indroom = None
+
+        # room ids, in the order the teams were placed, and as a set
+        self.teamrooms = []
+        self.teamroomset = set()
+        self.unplaced = len(teams)
+
+        self.gutsroom = None
+        self.awardsroom = None
+
+
+class Room:
+    __slots__ = ["id", "building", "number", "buildingid", "indcap",
+                 "teamcap", "gutscap", "awardscap", "indassigned",
+                 "teamassigned", "powerteams", "gutsassigned",
+                 "awardsassigned"]
+
+    def __init__(self, building, number, indcap, teamcap, gutscap,
+                 awardscap):
+        # set by `room_list_to_building_object`
+        self.id = None
+        self.buildingid = None
+
+        self.building = building
+        self.number = number
+        self.indcap = indcap
+        self.teamcap = teamcap
+        self.gutscap = gutscap
+        self.awardscap = awardscap
+        self.indassigned = 0
+        self.teamassigned = 0
+        self.powerteams = 0
+        self.gutsassigned = 0
+        self.awardsassigned = 0
+
+
+class Building:
+    __slots__ = ["id", "name", "rooms", "indcap", "indassigned", "teamcap",
+                 "teamassigned", "gutscap", "awardscap"]
+
+    def __init__(self, id, name):
+        self.id = id
+        self.name = name
+        self.rooms = []
+        self.indcap = 0
+        self.indassigned = 0
+        self.teamcap = 0
+        self.teamassigned = 0
+        self.gutscap = 0
+        self.awardscap = 0
 
 
 ##################
@@ -131,6 +297,16 @@ def print_help():
     print("  -p POWERINDEX_CSV            File containing power indices.")
     print("  -m MONTH                     The month of the tournament.")
     print("  -i INDIV_ROOM                Where individuals will compete.")
+    print("  -e ENGINE                    Either greedy, flow or partition.")
+    print("  -b BUDGET                    Seconds the flow engine may take.")
+    print("  -a PREVIOUS_ASSIGNMENTS_CSV  Earlier assignments to repair.")
+    print("  -c CACHE                     Either on, off or clear.")
+    print("  -A AWARDS_POLICY             Either spread or bestfit.")
+    print("  -l LOCAL_SEARCH_BUDGET       Seconds to spend improving.")
+    print("  -R RESTARTS                  Number of local searches to run.")
+    print("  -w WORKERS                   Clusters for the partition engine.")
+    print("  -P PROFILE                   Either off, on or cprofile.")
+    print("  -O OUTPUTS                   Extra outputs, e.g. rosters^jsonl.")
 
     print("\nThe argument requirements can be found ")
     print("at the top of `assign_rooms.py`.\n")
@@ -171,6 +347,45 @@ def parse_arguments():
             passed_in["month"] = sys.argv[index + 1]
         elif sys.argv[index] == "-i":
             passed_in["indiv_room"] = sys.argv[index + 1]
+        elif sys.argv[index] == "-e":
+            if sys.argv[index + 1] not in engines:
+                raise ValueError("The engine must be one of " +
+                                 ", ".join(engines) + ".")
+            passed_in["engine"] = sys.argv[index + 1]
+        elif sys.argv[index] == "-b":
+            passed_in["budget"] = sys.argv[index + 1]
+        elif sys.argv[index] == "-a":
+            if not os.path.isfile(sys.argv[index + 1]):
+                raise ValueError("The file " + sys.argv[index + 1] +
+                                 " passed in is not valid.")
+            passed_in["previous"] = sys.argv[index + 1]
+        elif sys.argv[index] == "-c":
+            if sys.argv[index + 1] not in cache_modes:
+                raise ValueError("The cache must be one of " +
+                                 ", ".join(cache_modes) + ".")
+            passed_in["cache"] = sys.argv[index + 1]
+        elif sys.argv[index] == "-A":
+            if sys.argv[index + 1] not in awards_policies:
+                raise ValueError("The awards policy must be one of " +
+                                 ", ".join(awards_policies) + ".")
+            passed_in["awards_policy"] = sys.argv[index + 1]
+        elif sys.argv[index] == "-l":
+            passed_in["local_search"] = sys.argv[index + 1]
+        elif sys.argv[index] == "-R":
+            passed_in["restarts"] = sys.argv[index + 1]
+        elif sys.argv[index] == "-w":
+            passed_in["workers"] = sys.argv[index + 1]
+        elif sys.argv[index] in ["-P", "--profile"]:
+            if sys.argv[index + 1] not in profiles:
+                raise ValueError("The profile must be one of " +
+                                 ", ".join(profiles) + ".")
+            passed_in["profile"] = sys.argv[index + 1]
+        elif sys.argv[index] == "-O":
+            for output in sys.argv[index + 1].split("^"):
+                if output not in extra_outputs:
+                    raise ValueError("The outputs must be among " +
+                                     ", ".join(extra_outputs) + ".")
+            passed_in["outputs"] = sys.argv[index + 1]
         else:
             raise RuntimeError("You used an invalid flag. " +
                                "Use the -h flag to see all arguments/flags.")
@@ -182,20 +397,16 @@ def parse_arguments():
 
 
 def integrate_room(room):
-    room["indcap"] = int(room["indcap"])
-    room["teamcap"] = int(room["teamcap"])
-    room["gutscap"] = int(room["gutscap"])
-    room["awardscap"] = int(room["awardscap"])
-    return room
+    return Room(room["building"], room["number"], int(room["indcap"]),
+                int(room["teamcap"]), int(room["gutscap"]),
+                int(room["awardscap"]))
 
 
 def get_rooms_key(room):
-    return -room["indcap"]
+    return -room.indcap
 
 
-def get_rooms():
-    rooms_file = passed_in["rooms"] if passed_in["rooms"] else default["rooms"]
-
+def rooms_file_to_list(rooms_file):
     # minimum required columns:
     #   [building, number, indcap, teamcap, gutscap, awardscap]
     with open(rooms_file, "r") as file:
@@ -203,6 +414,11 @@ def get_rooms():
                       key=get_rooms_key)
 
 
+def get_rooms():
+    rooms_file = passed_in["rooms"] if passed_in["rooms"] else default["rooms"]
+    return rooms_file_to_list(rooms_file)
+
+
 ##################
 ## Organization ##
 ##################
@@ -210,8 +426,9 @@ def get_rooms():
 
 def orgs_file_to_list(orgs_file):
     organizations = {}
-    for organization in list(csv.DictReader(open(orgs_file, "r"))):
-        organizations[int(organization["id"])] = organization["name"]
+    with open(orgs_file, "r") as file:
+        for organization in csv.DictReader(file):
+            organizations[int(organization["id"])] = organization["name"]
     return organizations
 
 
@@ -225,11 +442,10 @@ def get_organizations():
 #################
 
 
-def get_powerindices():
-    pi_file = passed_in["powerindices"] if passed_in["powerindices"] \
-              else default["powerindices"]
+def powerindices_file_to_object(pi_file):
     pi_object = {}
-    pi_list = list(csv.DictReader(open(pi_file, "r")))
+    with open(pi_file, "r") as file:
+        pi_list = list(csv.DictReader(file))
     for pi in pi_list:
         pi_object[int(pi["orgid"])] = {
             "index": int(pi["powerindex"]),
@@ -238,18 +454,16 @@ def get_powerindices():
     return pi_object
 
 
-# checks if a team with a power index has already been assigned to a
-# (team) room
-def power_present(teams):
-    for team in teams:
-        if "powerindex" in team:
-            return True
-    return False
+def get_powerindices():
+    pi_file = passed_in["powerindices"] if passed_in["powerindices"] \
+              else default["powerindices"]
+    return powerindices_file_to_object(pi_file)
 
 
-# checks whether a team with a power index can be placed in a given room
-def power_possible(team, list):
-    return "powerindex" not in team or not power_present(list)
+# checks whether a team with a power index can be placed in a given (team)
+#   room; rooms keep a running count of their power teams, so this is O(1)
+def power_possible(team, room):
+    return team.powerindex is None or room.powerteams == 0
 
 
 ###########
@@ -266,9 +480,94 @@ def get_month():
 ##########################
 
 
-def get_indiv_team_room():
-    return passed_in["indiv_room"] if passed_in["indiv_room"] \
-        else default["indiv_room"]
+# when repairing `previous` assignments without INDIV_ROOM, the individuals
+#   keep their previous room
+def get_indiv_team_room(previous=None):
+    if passed_in["indiv_room"]:
+        return passed_in["indiv_room"]
+    if previous is not None:
+        from repair_rooms import previous_indiv_room
+
+        indiv_room = previous_indiv_room(previous)
+        if indiv_room:
+            return indiv_room
+    return default["indiv_room"]
+
+
+###########
+## Cache ##
+###########
+
+
+def get_cache():
+    return passed_in["cache"] if passed_in["cache"] else default["cache"]
+
+
+def get_input_file(kind):
+    return passed_in[kind] if passed_in[kind] else default[kind]
+
+
+# the files and options that a cached result is keyed on
+def result_paths():
+    paths = [get_input_file(x)
+             for x in ["teams", "orgs", "powerindices", "rooms"]]
+    return paths + ([passed_in["previous"]] if passed_in["previous"] else [])
+
+
+def result_options():
+    return [get_month(), get_indiv_team_room(), get_engine(), get_budget(),
+            get_awards_policy(), get_local_search(), get_restarts(),
+            get_workers() if get_engine() == "partition" else None]
+
+
+############
+## Engine ##
+############
+
+
+def get_engine():
+    return passed_in["engine"] if passed_in["engine"] else default["engine"]
+
+
+def get_budget():
+    return float(passed_in["budget"] if passed_in["budget"]
+                 else default["budget"])
+
+
+def get_awards_policy():
+    return passed_in["awards_policy"] if passed_in["awards_policy"] \
+        else default["awards_policy"]
+
+
+def get_local_search():
+    return float(passed_in["local_search"] if passed_in["local_search"]
+                 else default["local_search"])
+
+
+def get_restarts():
+    return int(passed_in["restarts"] if passed_in["restarts"]
+               else default["restarts"])
+
+
+def get_workers():
+    return int(passed_in["workers"] or default["workers"] or
+               os.cpu_count() or 1)
+
+
+def get_outputs():
+    outputs = passed_in["outputs"] if passed_in["outputs"] \
+        else default["outputs"]
+    return [x for x in outputs.split("^") if x]
+
+
+###############
+## Profiling ##
+###############
+
+
+def get_profile():
+    return passed_in["profile"] if passed_in["profile"] \
+        else default["profile"]
 
 
 ###########
@@ -277,16 +576,88 @@ def get_indiv_team_room():
 
 
 def integrate_team(team):
-    team["orgid"] = int(team["orgid"])
-    team["teamid"] = int(team["teamid"])
-    return team
+    return Team(int(team["orgid"]), int(team["teamid"]), team["teamname"],
+                team["shortname"])
+
+
+def teams_file_to_list(teams_file):
+    with open(teams_file, "r") as file:
+        return [integrate_team(x) for x in list(csv.DictReader(file))]
 
 
 def get_teams():
     teams_file = passed_in["teams"] if passed_in["teams"] \
                  else default["teams"]
-    with open(teams_file, "r") as file:
-        return [integrate_team(x) for x in list(csv.DictReader(file))]
+    return teams_file_to_list(teams_file)
+
+
+####################
+## Capacity Index ##
+####################
+
+
+# a max segment tree over the free capacities of a list of rooms, which lets
+#   us find the first room (in list order) with enough free seats in
+#   logarithmic time instead of walking the whole list
+def build_capacity_index(capacities):
+    size = 1
+    while size < len(capacities):
+        size *= 2
+
+    tree = [0] * (2 * size)
+    tree[size:size + len(capacities)] = capacities
+    for node in range(size - 1, 0, -1):
+        tree[node] = max(tree[2 * node], tree[2 * node + 1])
+
+    return {"size": size, "tree": tree}
+
+
+def update_capacity_index(index, position, capacity):
+    tree = index["tree"]
+    node = index["size"] + position
+    tree[node] = capacity
+    node //= 2
+    while node:
+        tree[node] = max(tree[2 * node], tree[2 * node + 1])
+        node //= 2
+
+
+# returns the position of the first room with at least `needed` free seats,
+#   or None if there is no such room
+def first_fit(index, needed):
+    tree = index["tree"]
+    if tree[1] < needed:
+        return None
+
+    node = 1
+    while node < index["size"]:
+        node *= 2
+        if tree[node] < needed:
+            node += 1
+    return node - index["size"]
+
+
+# like `first_fit`, but only looks at positions from `start` on
+def first_fit_from(index, needed, start):
+    tree = index["tree"]
+    if start >= index["size"]:
+        return None
+
+    # walk right from the leaf until we reach a subtree that has room,
+    #   climbing whenever we are a right child
+    node = index["size"] + start
+    while tree[node] < needed:
+        while node & 1:
+            node //= 2
+        if not node:
+            return None
+        node += 1
+
+    while node < index["size"]:
+        node *= 2
+        if tree[node] < needed:
+            node += 1
+    return node - index["size"]
 
 
 ###############################
@@ -297,19 +668,15 @@ def get_teams():
 # sort organizations by number of teams
 def organization_key(org):
     # we want to sort in decreasing order, putting individuals at the head
-    if org["orgname"] == individual_org_name:
+    if org.orgname == individual_org_name:
         # all other power indices are >= 1, and 10  is sufficiently larger than
         #   the maximum number of teams an organization can have
         return (0, -10)
-    return (org["powerindex"], -len(org["teams"]))
+    return (org.powerindex, -len(org.teams))
 
 
-def team_list_to_org_list(team_list):
-    orgs_raw = get_organizations()
-
-    teams_sorted = sorted(team_list, key=itemgetter("orgid", "teamid"))
-
-    powerindices = get_powerindices()
+def team_list_to_org_list(team_list, orgs_raw, powerindices):
+    teams_sorted = sorted(team_list, key=attrgetter("orgid", "teamid"))
 
     # get list of organizations with associated number of teams
     organizations = []
@@ -318,319 +685,602 @@ def team_list_to_org_list(team_list):
         team = teams_sorted[index]
         org_teams.append(team)
         if index == len(teams_sorted) - 1 or \
-           team["orgid"] != teams_sorted[index + 1]["orgid"]:
-            powerindex = powerindices[team["orgid"]]["index"] \
-                         if team["orgid"] in powerindices else 100
+           team.orgid != teams_sorted[index + 1].orgid:
+            powerindex = powerindices[team.orgid]["index"] \
+                         if team.orgid in powerindices else 100
             if powerindex < 100:
                 for org_team in org_teams:
-                    if org_team["teamid"] \
-                       in powerindices[team["orgid"]]["teamids"]:
-                        org_team["powerindex"] = powerindex
-
-            organizations.append({
-                "orgid": team["orgid"],
-                "orgname": orgs_raw[team["orgid"]],
-                "teams": org_teams,
-                "number_of_teams": len(org_teams),
-                "powerindex": powerindex,
-                "indbuilding": None,
-                "indroom": None,
-                "teambuilding": None,
-                "teamrooms": [],
-                "gutsbuilding": None,
-                "gutsroom": None,
-                "awardsbuilding": None,
-                "awardsroom": None
-            })
+                    if org_team.teamid in powerindices[team.orgid]["teamids"]:
+                        org_team.powerindex = powerindex
+
+            organizations.append(Organization(team.orgid, orgs_raw[team.orgid],
+                                              org_teams, powerindex))
             org_teams = []
 
     return sorted(organizations, key=organization_key)
 
 
-# add useful fields to room objects
-def augment_room_object(room):
-    room["indassigned"] = 0
-    room["teamassigned"] = 0
-    room["teamroundteams"] = []
-    room["gutsassigned"] = 0
-    room["awardsassigned"] = 0
-    return room
+# arrange organizations by powerindex, then by size
+def awards_key(org):
+    return (org.powerindex, -org.number_of_teams)
 
 
-# the difference here from the organizations is that we cared about an
-#   ordering on organizations
-def room_list_to_building_object(room_list):
-    rooms_augmented = [augment_room_object(x) for x in room_list]
-
-    buildings = {}
-    for room in rooms_augmented:
-        room_key = room["building"] + " " + room["number"]
-        if room["building"] in buildings:
-            building = buildings[room["building"]]
-            building["rooms"][room_key] = room
-            building["indcap"] += room["indcap"]
-            building["teamcap"] += room["teamcap"]
-            building["gutscap"] += room["gutscap"]
-            building["awardscap"] += room["awardscap"]
-        else:
-            buildings[room["building"]] = {
-                "name": room["building"],
-                "rooms": {room_key: room},
-                "indcap": room["indcap"],
-                "indassigned": 0,
-                "teamcap": room["teamcap"],
-                "teamassigned": 0,
-                "gutscap": room["gutscap"],
-                "awardscap": room["awardscap"]
-            }
+def room_fields(room):
+    return [room.building, room.number] if room else [None, None]
 
-    return buildings
 
+# the output row for a single team, in the order of room_assignment_headers
+def assignment_row(team, org):
+    if team.teamroom is None:
+        raise RuntimeError("Not able to assign the team " + team.teamname +
+                           " to a team room.")
 
-########
-# Main #
-########
+    return [team.orgid, team.teamid, team.teamname, team.shortname] + \
+        room_fields(team.teamroom) + [org.orgname] + \
+        room_fields(org.indroom) + room_fields(org.gutsroom) + \
+        room_fields(org.awardsroom)
 
-if __name__ == '__main__':
-    parse_arguments()
 
-    month = get_month()
-    teams = get_teams()
+# every output row, sorted by team building; this is the only sort, and the
+#   other views of the rows (see `export_rooms.py`) group them as they are
+def assignment_rows(organizations):
+    room_assignment_list = [assignment_row(team, org)
+                            for org in organizations for team in org.teams]
+    room_assignment_list.sort(key=itemgetter(4))
+    return room_assignment_list
 
-    # starts off sorted by individual capacity in decreasing order
-    rooms = get_rooms()
 
-    # put teams and rooms into their larger groups
-    organizations = team_list_to_org_list(teams)
-    buildings = room_list_to_building_object(rooms)
+# looks a room up by its building and number, e.g. for INDIV_ROOM
+def find_room(buildings, building_name, number):
+    for building in buildings:
+        if building.name == building_name:
+            for room in building.rooms:
+                if room.number == number:
+                    return room
+    raise ValueError("The room " + building_name + " " + number +
+                     " is not in the room list.")
 
-    # set individual team rooms first
-    indiv_org = organizations[0]
-    indiv_team_count = len(indiv_org["teams"])
 
-    if indiv_org["orgname"] != individual_org_name:
-        raise RuntimeError("The organizations list does not start " +
-                           "with the individuals organization.")
+# place a team in a team room, keeping the room, building and organization
+#   bookkeeping in sync
+def assign_team_room(team, org, room, building):
+    room.teamassigned += 1
+    building.teamassigned += 1
+    if team.powerindex is not None:
+        room.powerteams += 1
 
-    indiv_room_parsed = get_indiv_team_room().split("^")
-    indiv_room_key = indiv_room_parsed[0] + " " + indiv_room_parsed[1]
+    team.teamroom = room
+    org.teamrooms.append(room.id)
+    org.teamroomset.add(room.id)
+    org.unplaced -= 1
 
-    indiv_building = buildings[indiv_room_parsed[0]]
-    indiv_room = indiv_building["rooms"][indiv_room_key]
-    if indiv_room["indcap"] < indiv_team_count or \
-       indiv_room["teamcap"] < indiv_team_count:
-        raise ValueError("The room cannot hold all the individual teams.")
 
-    indiv_room["indassigned"] += indiv_team_count
-    indiv_room["teamassigned"] += indiv_team_count
-    indiv_building["indassigned"] += indiv_team_count
-    indiv_building["teamassigned"] += indiv_team_count
-    indiv_org["indbuilding"] = indiv_room_parsed[0]
-    indiv_org["indroom"] = indiv_room_parsed[1]
-    indiv_org["teamrooms"].append(indiv_room_key)
+# the difference here from the organizations is that we cared about an
+#   ordering on organizations; rooms and buildings get their ids here, and
+#   `buildings[room.buildingid]` is the building a room belongs to
+def room_list_to_building_object(room_list):
+    buildings = []
+    building_ids = {}
+    for room_id, room in enumerate(room_list):
+        room.id = room_id
+        if room.building not in building_ids:
+            building_ids[room.building] = len(buildings)
+            buildings.append(Building(len(buildings), room.building))
+
+        building = buildings[building_ids[room.building]]
+        room.buildingid = building.id
+        building.rooms.append(room)
+        building.indcap += room.indcap
+        building.teamcap += room.teamcap
+        building.gutscap += room.gutscap
+        building.awardscap += room.awardscap
 
-    for team in indiv_org["teams"]:
-        team["teambuilding"] = indiv_room_parsed[0]
-        team["teamroom"] = indiv_room_parsed[1]
+    return buildings
 
-    # assign individual buildings, and assign a single team per organization
-    #   to that room if it is also a team room
-    for org in organizations[1:]:
-        # all modifications will happen to the rooms within `buildings`
-        for room_facade in rooms:
-            room_key = room_facade["building"] + " " + room_facade["number"]
-            building = buildings[room_facade["building"]]
-            room = building["rooms"][room_key]
-
-            if len(org["teams"]) <= room["indcap"] - room["indassigned"]:
-                room["indassigned"] += org["number_of_teams"]
-                building["indassigned"] += org["number_of_teams"]
-                org["indbuilding"] = room["building"]
-                org["indroom"] = room["number"]
-
-                if room["teamcap"] > room["teamassigned"]:
-                    for team in org["teams"]:
-                        if power_possible(team, room["teamroundteams"]):
-                            room["teamassigned"] += 1
-                            building["teamassigned"] += 1  # bookkeeping
-                            room["teamroundteams"].append(team)
-
-                            team["teambuilding"] = room["building"]
-                            team["teamroom"] = room["number"]
-                            org["teamrooms"].append(room_key)
-                            break
-                break
 
-    # first pass to keep as many teams as possible in the same building,
-    # starting with the power teams
-    for org in organizations[1:]:
-        if len(org["teamrooms"]) == org["number_of_teams"]:
-            continue
+########################
+# Assignment Functions #
+########################
 
-        building = buildings[org["indbuilding"]]
-        rooms_in_building = building["rooms"]
-        for room_key in rooms_in_building:
-            if len(org["teamrooms"]) == org["number_of_teams"]:
-                break
 
-            room = rooms_in_building[room_key]
-            if room["teamcap"] > room["teamassigned"] and \
-               room_key not in org["teamrooms"]:
-                for team in org["teams"]:
-                    if "teambuilding" not in team and "powerindex" in team and \
-                       power_possible(team, room["teamroundteams"]):
-                        room["teamassigned"] += 1
-                        building["teamassigned"] += 1
-                        room["teamroundteams"].append(team)
-
-                        team["teambuilding"] = room["building"]
-                        team["teamroom"] = room["number"]
-                        org["teamrooms"].append(room_key)
-                        break
-
-    # assign the rest of the team buildings
-    for org in organizations[1:]:
-        if len(org["teamrooms"]) == org["number_of_teams"]:
-            continue
+# the individuals organization takes the room passed in with -i for both the
+#   individual round and the team round
+def assign_individuals_room(organizations, buildings, indiv_room_string):
+    indiv_org = organizations[0]
+    indiv_team_count = len(indiv_org.teams)
 
-        for team in org["teams"]:
-            if "teambuilding" in team or "powerindex" not in team:
-                continue
+    if indiv_org.orgname != individual_org_name:
+        raise RuntimeError("The organizations list does not start " +
+                           "with the individuals organization.")
 
-            for room_facade in rooms:
-                room_key = room_facade["building"] + " " + \
-                           room_facade["number"]
-                building = buildings[room_facade["building"]]
-                room = building["rooms"][room_key]
-                if room["teamcap"] > room["teamassigned"] and \
-                   (room_key not in org["teamrooms"]) and \
-                   power_possible(team, room["teamroundteams"]):
-                    room["teamassigned"] += 1
-                    building["teamassigned"] += 1
-                    room["teamroundteams"].append(team)
-
-                    org["teamrooms"].append(room_key)
-                    team["teambuilding"] = room["building"]
-                    team["teamroom"] = room["number"]
-                    break
+    indiv_room_parsed = indiv_room_string.split("^")
+    indiv_room = find_room(buildings, indiv_room_parsed[0],
+                           indiv_room_parsed[1])
+    indiv_building = buildings[indiv_room.buildingid]
+    if indiv_room.indcap < indiv_team_count or \
+       indiv_room.teamcap < indiv_team_count:
+        raise ValueError("The room cannot hold all the individual teams.")
 
-    # now repeat for the non-power teams
+    indiv_room.indassigned += indiv_team_count
+    indiv_room.teamassigned += indiv_team_count
+    indiv_building.indassigned += indiv_team_count
+    indiv_building.teamassigned += indiv_team_count
+    indiv_org.indroom = indiv_room
+    indiv_org.teamrooms.append(indiv_room.id)
+    indiv_org.teamroomset.add(indiv_room.id)
+    indiv_org.unplaced = 0
+
+    for team in indiv_org.teams:
+        team.teamroom = indiv_room
+
+
+# runs `function(*args)`, adding the time it took to `timings[name]` when
+#   timings are being collected; a phase that raises is still recorded, so
+#   the last entry names the phase that failed
+def timed(timings, name, function, *args):
+    if timings is None:
+        return function(*args)
+
+    start = time.perf_counter()
+    try:
+        return function(*args)
+    finally:
+        timings[name] = timings.get(name, 0) + time.perf_counter() - start
+
+
+# assign individual buildings, and assign a single team per organization to
+#   that room if it is also a team room
+def assign_individual_rooms(organizations, rooms, buildings):
+    # index the free individual seats so that each organization can find the
+    #   first room (in order of decreasing individual capacity) that fits it
+    indcap_index = build_capacity_index(
+        [x.indcap - x.indassigned for x in rooms])
+
+    power_checks = 0
     for org in organizations[1:]:
-        if len(org["teamrooms"]) == org["number_of_teams"]:
-            continue
+        room_index = first_fit(indcap_index, org.number_of_teams)
+        if room_index is None:
+            count_work("individual", len(organizations) - 1, power_checks, 1)
+            raise RuntimeError("Not able to assign the organization " +
+                               org.orgname + " to an individual room.")
+
+        room = rooms[room_index]
+        building = buildings[room.buildingid]
+
+        room.indassigned += org.number_of_teams
+        building.indassigned += org.number_of_teams
+        update_capacity_index(indcap_index, room_index,
+                              room.indcap - room.indassigned)
+        org.indroom = room
+
+        if room.teamcap > room.teamassigned:
+            for team in org.teams:
+                power_checks += 1
+                if power_possible(team, room):
+                    assign_team_room(team, org, room, building)
+                    break
+
+    # each organization probes the capacity index once
+    count_work("individual", len(organizations) - 1, power_checks, 0)
+
 
-        building = buildings[org["indbuilding"]]
-        rooms_in_building = building["rooms"]
-        for room_key in rooms_in_building:
-            if len(org["teamrooms"]) == org["number_of_teams"]:
+# keep as many teams as possible in their organization's individual
+#   building; organizations with every team placed are skipped
+def assign_team_rooms_in_building(organizations, buildings, power_only):
+    rooms_probed = power_checks = capacity_rejections = 0
+    for org in [x for x in organizations[1:] if x.unplaced]:
+        building = buildings[org.indroom.buildingid]
+        for room in building.rooms:
+            if not org.unplaced:
                 break
 
-            room = rooms_in_building[room_key]
-            if room["teamcap"] > room["teamassigned"] and \
-               room_key not in org["teamrooms"]:
-                for team in org["teams"]:
-                    if "teambuilding" not in team and \
-                       power_possible(team, room["teamroundteams"]):
-                        room["teamassigned"] += 1
-                        building["teamassigned"] += 1
-                        room["teamroundteams"].append(team)
-
-                        team["teambuilding"] = room["building"]
-                        team["teamroom"] = room["number"]
-                        org["teamrooms"].append(room_key)
-                        break
-    for org in organizations[1:]:
-        if len(org["teamrooms"]) == org["number_of_teams"]:
-            continue
+            rooms_probed += 1
+            if room.teamcap <= room.teamassigned:
+                capacity_rejections += 1
+            elif room.id not in org.teamroomset:
+                for team in org.teams:
+                    if team.teamroom is None and \
+                       (not power_only or team.powerindex is not None):
+                        power_checks += 1
+                        if power_possible(team, room):
+                            assign_team_room(team, org, room, building)
+                            break
 
-        for team in org["teams"]:
-            if "teambuilding" in team:
+    count_work("team_power_building" if power_only else "team_building",
+               rooms_probed, power_checks, capacity_rejections)
+
+
+# place the remaining teams in the first team room that takes them
+def assign_team_rooms_anywhere(organizations, rooms, buildings, power_only):
+    rooms_probed = power_checks = capacity_rejections = 0
+    for org in [x for x in organizations[1:] if x.unplaced]:
+        for team in org.teams:
+            if team.teamroom is not None or \
+               (power_only and team.powerindex is None):
                 continue
 
-            for room_facade in rooms:
-                room_key = room_facade["building"] + " " + \
-                           room_facade["number"]
-                building = buildings[room_facade["building"]]
-                room = building["rooms"][room_key]
-                if room["teamcap"] > room["teamassigned"] and \
-                   (room_key not in org["teamrooms"]) and \
-                   power_possible(team, room["teamroundteams"]):
-                    room["teamassigned"] += 1
-                    building["teamassigned"] += 1
-                    room["teamroundteams"].append(team)
-
-                    org["teamrooms"].append(room_key)
-                    team["teambuilding"] = room["building"]
-                    team["teamroom"] = room["number"]
-                    break
+            # most rooms are full by now, so only the open ones are counted
+            #   as we go; a room's id is its position in `rooms`
+            probed = len(rooms)
+            open_rooms = 0
+            for room in rooms:
+                if room.teamcap > room.teamassigned:
+                    open_rooms += 1
+                    if room.id not in org.teamroomset:
+                        power_checks += 1
+                        if power_possible(team, room):
+                            assign_team_room(team, org, room,
+                                             buildings[room.buildingid])
+                            probed = room.id + 1
+                            break
+            rooms_probed += probed
+            capacity_rejections += probed - open_rooms
 
-    # collect awards rooms
-    awards_rooms = [x for x in rooms if x["awardscap"] > 0]
-    award_stride_limit = len(awards_rooms)
+    count_work("team_power_anywhere" if power_only else "team_anywhere",
+               rooms_probed, power_checks, capacity_rejections)
 
-    # arrange teams by powerindex, then by size
-    def awards_key(room):
-        return(room["powerindex"], -room["number_of_teams"])
-    organizations = sorted(organizations, key=awards_key)
 
-    # assign awards rooms
+def take_awards_room(org, room):
+    org.awardsroom = room
+    room.awardsassigned += org.number_of_teams
+
+
+# the organization at stride `n` takes the first awards room at or after
+#   position `n` (wrapping around) that fits it, so that consecutive
+#   organizations land in different rooms
+def assign_awards_spread(organizations, awards_rooms, awards_index):
+    rooms_probed = capacity_rejections = 0
     award_stride = 0
     for org in organizations:
-        awards_room_index = award_stride
-        awards_room_original_index = award_stride
-        while (not org["awardsbuilding"]):
-            room = awards_rooms[awards_room_index]
-            if len(org["teams"]) <= room["awardscap"] - room["awardsassigned"]:
-                org["awardsbuilding"] = room["building"]
-                org["awardsroom"] = room["number"]
-                room["awardsassigned"] += len(org["teams"])
-                break
-            awards_room_index = (awards_room_index + 1) % award_stride_limit
-            if (awards_room_index == awards_room_original_index):
-                raise RuntimeError("Not able to assign the organization " +
-                                   org["orgname"] + " to an awards room.")
-        award_stride = (award_stride + 1) % award_stride_limit
+        rooms_probed += 1
+        room_index = first_fit_from(awards_index, org.number_of_teams,
+                                    award_stride)
+        if room_index is None:
+            capacity_rejections += 1
+            room_index = first_fit(awards_index, org.number_of_teams)
+        if room_index is None:
+            count_work("awards", rooms_probed, 0, capacity_rejections)
+            raise RuntimeError("Not able to assign the organization " +
+                               org.orgname + " to an awards room.")
+
+        room = awards_rooms[room_index]
+        take_awards_room(org, room)
+        update_capacity_index(awards_index, room_index,
+                              room.awardscap - room.awardsassigned)
+        award_stride = (award_stride + 1) % len(awards_rooms)
+
+    count_work("awards", rooms_probed, 0, capacity_rejections)
+
+
+# largest organizations first, each into the room with the least free space
+#   that still fits it; rooms are bucketed by free space, and the index is
+#   over the bucket sizes, so the first non-empty bucket at or above the
+#   organization's size is the best fit. Each bucket is a heap of room
+#   positions, so ties go to the first room and every pick costs a log
+#   factor.
+def assign_awards_bestfit(organizations, awards_rooms):
+    buckets = [[] for _ in range(max(x.awardscap for x in awards_rooms) + 1)]
+    for room_index, room in enumerate(awards_rooms):
+        heapq.heappush(buckets[room.awardscap - room.awardsassigned],
+                       room_index)
+    bucket_index = build_capacity_index([len(x) for x in buckets])
+
+    rooms_probed = 0
+    for org in sorted(organizations, key=lambda x: -x.number_of_teams):
+        rooms_probed += 1
+        free = first_fit_from(bucket_index, 1, org.number_of_teams)
+        if free is None:
+            count_work("awards", rooms_probed, 0, 1)
+            raise RuntimeError("Not able to assign the organization " +
+                               org.orgname + " to an awards room.")
+
+        room_index = heapq.heappop(buckets[free])
+        room = awards_rooms[room_index]
+        take_awards_room(org, room)
+
+        update_capacity_index(bucket_index, free, len(buckets[free]))
+        free -= org.number_of_teams
+        heapq.heappush(buckets[free], room_index)
+        update_capacity_index(bucket_index, free, len(buckets[free]))
+
+    count_work("awards", rooms_probed, 0, 0)
+
+
+# expects the organizations in awards order; see AWARDS_POLICY at the top
+def assign_awards_rooms(organizations, rooms, policy="spread"):
+    # collect awards rooms
+    awards_rooms = [x for x in rooms if x.awardscap > 0]
+    if not awards_rooms:
+        raise RuntimeError("There are no awards rooms.")
 
+    if policy == "bestfit":
+        assign_awards_bestfit(organizations, awards_rooms)
+    else:
+        assign_awards_spread(organizations, awards_rooms,
+                             build_capacity_index(
+                                 [x.awardscap - x.awardsassigned
+                                  for x in awards_rooms]))
+
+
+def assign_guts_rooms(organizations, rooms):
     # collect guts rooms
-    guts_rooms = [x for x in rooms if x["gutscap"] > 0]
+    guts_rooms = [x for x in rooms if x.gutscap > 0]
+
+    rooms_probed = capacity_rejections = 0
 
     # first pass to ensure that most (if not all) of the teams in a guts room
-    #   that becomes an awards room stay there
-    stride = 0
+    #   that becomes an awards room stay there; the awards room is at hand,
+    #   so there is nothing to search
     for org in organizations:
-        for room in guts_rooms:
-            if room["building"] == org["awardsbuilding"] and \
-               room["number"] == org["awardsroom"] and \
-               room["gutscap"] - room["gutsassigned"] >= \
-               org["number_of_teams"]:
-                org["gutsbuilding"] = room["building"]
-                org["gutsroom"] = room["number"]
-                room["gutsassigned"] += org["number_of_teams"]
-                break
-
-    # second pass to assign the rest of the guts rooms
+        room = org.awardsroom
+        rooms_probed += 1
+        if room.gutscap - room.gutsassigned >= org.number_of_teams:
+            org.gutsroom = room
+            room.gutsassigned += org.number_of_teams
+        elif room.gutscap > 0:
+            capacity_rejections += 1
+
+    # second pass to assign the rest of the guts rooms, each to the first
+    #   guts room that fits it
+    gutscap_index = build_capacity_index(
+        [x.gutscap - x.gutsassigned for x in guts_rooms])
     for org in organizations:
-        if org["gutsroom"]:
+        if org.gutsroom:
             continue
-        for room in guts_rooms:
-            if len(org["teams"]) <= room["gutscap"] - room["gutsassigned"]:
-                org["gutsbuilding"] = room["building"]
-                org["gutsroom"] = room["number"]
-                room["gutsassigned"] += len(org["teams"])
-                break
 
-    # generate new csv
-    room_assignment_list = []
-    for org in organizations:
-        for team in org["teams"]:
-            room_assignment_list.append(
-                [team[x] for x in room_assignment_headers[:team_org_split]] +
-                [org[x] for x in room_assignment_headers[team_org_split:]]
-            )
-    room_assignment_list = sorted(room_assignment_list, key=itemgetter(4))
-
-    with open(user_info.work_dir + "/room_assignments.csv", "w") as file:
+        rooms_probed += 1
+        room_index = first_fit(gutscap_index, org.number_of_teams)
+        if room_index is None:
+            capacity_rejections += 1
+            continue
+
+        room = guts_rooms[room_index]
+        org.gutsroom = room
+        room.gutsassigned += org.number_of_teams
+        update_capacity_index(gutscap_index, room_index,
+                              room.gutscap - room.gutsassigned)
+
+    count_work("guts", rooms_probed, 0, capacity_rejections)
+
+
+# the original sequence of greedy passes; returns the organizations in the
+#   order used for awards and guts (and thus output). Pass a dict as
+#   `timings` to collect the seconds spent in each pass.
+def assign_greedy(organizations, rooms, buildings, timings=None,
+                  awards_policy="spread"):
+    timed(timings, "individual", assign_individual_rooms, organizations,
+          rooms, buildings)
+
+    # power teams first, then the rest
+    timed(timings, "team_power_building", assign_team_rooms_in_building,
+          organizations, buildings, True)
+    timed(timings, "team_power_anywhere", assign_team_rooms_anywhere,
+          organizations, rooms, buildings, True)
+    timed(timings, "team_building", assign_team_rooms_in_building,
+          organizations, buildings, False)
+    timed(timings, "team_anywhere", assign_team_rooms_anywhere,
+          organizations, rooms, buildings, False)
+
+    return assign_org_rooms(organizations, rooms, timings, awards_policy)
+
+
+# the awards and guts passes, once every team has its rooms; returns the
+#   organizations in the order used for awards and guts (and thus output)
+def assign_org_rooms(organizations, rooms, timings=None,
+                     awards_policy="spread"):
+    # arrange teams by powerindex, then by size
+    organizations = sorted(organizations, key=awards_key)
+
+    timed(timings, "awards", assign_awards_rooms, organizations, rooms,
+          awards_policy)
+    timed(timings, "guts", assign_guts_rooms, organizations, rooms)
+
+    return organizations
+
+
+#######
+# API #
+#######
+
+
+# runs a whole assignment in memory: `teams` and `rooms` are lists of parsed
+#   records (see `teams_file_to_list` and `rooms_file_to_list`), `orgs` maps
+#   organization ids to names and `powerindices` is keyed by organization id.
+#   The inputs are not modified, so one set of inputs can be reused across
+#   many calls. Passing the rows of an earlier assignment as `previous` (see
+#   `read_assignments` in `repair_rooms.py`) repairs it instead. Pass a dict
+#   as `timings` to collect the seconds spent in each phase. A positive
+#   `local_search` budget improves the result afterwards (not when
+#   repairing, which should move as little as possible). `workers` caps
+#   the processes of the partition engine (which makes as many clusters)
+#   and of the local search restarts; it is every CPU by default.
+def compute_assignments(teams, orgs, powerindices, rooms, month, indiv_room,
+                        engine="greedy", budget=float(default["budget"]),
+                        previous=None, timings=None,
+                        awards_policy=default["awards_policy"],
+                        local_search=float(default["local_search"]),
+                        restarts=int(default["restarts"]), workers=None):
+    teams = [copy.copy(x) for x in teams]
+    rooms = sorted([copy.copy(x) for x in rooms], key=get_rooms_key)
+
+    # put teams and rooms into their larger groups
+    organizations = timed(timings, "organizations", team_list_to_org_list,
+                          teams, orgs, powerindices)
+    buildings = timed(timings, "buildings", room_list_to_building_object,
+                      rooms)
+
+    # rule out impossible inputs before doing any real work
+    from feasibility_rooms import check_feasibility
+
+    timed(timings, "feasibility", check_feasibility, organizations, rooms,
+          buildings, indiv_room)
+
+    diff = None
+    if previous is not None:
+        from repair_rooms import repair_assignments
+
+        organizations, diff = timed(timings, "repair", repair_assignments,
+                                    organizations, rooms, buildings,
+                                    previous, indiv_room)
+    elif engine == "flow":
+        from flow_assign import assign_flow
+
+        # set individual team rooms first
+        timed(timings, "individuals_room", assign_individuals_room,
+              organizations, buildings, indiv_room)
+
+        # the flow engine works on these in place, so keep a copy around in
+        #   case we have to fall back to the greedy passes
+        fallback = copy.deepcopy((organizations, rooms, buildings))
+        assigned = timed(timings, "flow", assign_flow, organizations, rooms,
+                         buildings, budget)
+        if assigned is None:
+            print("The flow engine did not find an assignment within " +
+                  "the budget; falling back to the greedy passes.")
+            organizations, rooms, buildings = fallback
+            assigned = assign_greedy(organizations, rooms, buildings,
+                                     timings, awards_policy)
+        organizations = assigned
+    elif engine == "partition":
+        from partition_rooms import assign_partitioned
+
+        timed(timings, "individuals_room", assign_individuals_room,
+              organizations, buildings, indiv_room)
+        organizations = assign_partitioned(
+            organizations, rooms, buildings, workers or os.cpu_count() or 1,
+            timings, awards_policy)
+    else:
+        # set individual team rooms first
+        timed(timings, "individuals_room", assign_individuals_room,
+              organizations, buildings, indiv_room)
+        organizations = assign_greedy(organizations, rooms, buildings,
+                                      timings, awards_policy)
+
+    improvement = None
+    if previous is None and local_search > 0:
+        from improve_rooms import improve_assignment
+
+        improvement = timed(timings, "local_search", improve_assignment,
+                            organizations, rooms, buildings, local_search,
+                            restarts, workers)
+
+    return {
+        "month": month,
+        "organizations": organizations,
+        "rooms": rooms,
+        "buildings": buildings,
+        "rows": timed(timings, "rows", assignment_rows, organizations),
+        "diff": diff,
+        "improvement": improvement
+    }
+
+
+# written to a temporary file first and moved into place, so that anyone
+#   reading the output (e.g. while `watch_rooms.py` rewrites it) never sees
+#   half of it
+def write_csv(path, headers, rows):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as file:
         writer = csv.writer(file)
-        writer.writerow(("Run script:", " ".join(sys.argv)))
-        writer.writerow(room_assignment_headers)
-        writer.writerows(room_assignment_list)
+        writer.writerows(headers)
+        writer.writerows(rows)
+    os.replace(temp_path, path)
+
+
+# `outputs` are any of `extra_outputs`
+def write_assignments(assignments, work_dir, run_script, outputs=()):
+    write_csv(work_dir + "/room_assignments.csv",
+              [("Run script:", run_script), room_assignment_headers],
+              assignments["rows"])
+
+    if outputs:
+        from export_rooms import write_exports
+
+        write_exports(assignments["rows"], work_dir, outputs)
+
+    if assignments["diff"] is not None:
+        from repair_rooms import diff_headers
+
+        write_csv(work_dir + "/room_assignments_diff.csv", [diff_headers],
+                  assignments["diff"])
+
+
+########
+# Main #
+########
+
+if __name__ == '__main__':
+    parse_arguments()
+
+    profile = get_profile()
+    timings = None
+    profiler = None
+    if profile != "off":
+        timings = {}
+        profile_rooms.counters = {}
+        if profile == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+    error = None
+    try:
+        from cache_rooms import assignment_result, load_input, open_cache, \
+            read_result, result_key, write_result
+
+        cache_dir = open_cache(get_cache(), user_info.work_dir)
+
+        # a run with the same inputs and options as an earlier one reuses
+        #   its result
+        key = None
+        assignments = None
+        if cache_dir is not None:
+            key = timed(timings, "result_key", result_key, result_paths(),
+                        result_options())
+            assignments = timed(timings, "load_result", read_result,
+                                cache_dir, "result", key)
+
+        if assignments is None:
+            previous = None
+            if passed_in["previous"]:
+                from repair_rooms import read_assignments
+                previous = timed(timings, "load_previous", read_assignments,
+                                 passed_in["previous"])
+
+            inputs = {x: timed(timings, "load_" + x, load_input, x,
+                               get_input_file(x), cache_dir)
+                      for x in ["teams", "orgs", "powerindices", "rooms"]}
+
+            assignments = compute_assignments(
+                inputs["teams"], inputs["orgs"], inputs["powerindices"],
+                inputs["rooms"], get_month(), get_indiv_team_room(previous),
+                engine=get_engine(), budget=get_budget(), previous=previous,
+                timings=timings, awards_policy=get_awards_policy(),
+                local_search=get_local_search(), restarts=get_restarts(),
+                workers=get_workers())
+
+            improvement = assignments["improvement"]
+            if improvement and improvement[1] < improvement[0]:
+                print("Local search lowered the score from " +
+                      str(improvement[0]) + " to " + str(improvement[1]) +
+                      ".")
+
+            if key is not None:
+                write_result(cache_dir, "result", key,
+                             assignment_result(assignments))
+
+        timed(timings, "write", write_assignments, assignments,
+              user_info.work_dir, " ".join(sys.argv), get_outputs())
+    except (RuntimeError, ValueError) as caught:
+        if profile == "off":
+            raise
+        error = caught
+
+    if profile != "off":
+        if profiler:
+            profiler.disable()
+        profile_rooms.write_profile_report(user_info.work_dir,
+                                           " ".join(sys.argv), timings,
+                                           profile_rooms.counters, profiler,
+                                           error)
+        if error is not None:
+            raise error
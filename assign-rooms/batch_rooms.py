@@ -0,0 +1,324 @@
+###########################
+# Some High Level Details #
+###########################
+
+
+# Assigns several tournaments (usually November and February) in one run.
+# Each tournament has its own month (-m), team list (-t) and individuals
+# room (-i), all repeatable and matched up in order; the organizations,
+# power indices and rooms are shared, so they are parsed once and handed to
+# each worker when it starts. The tournaments run side by side on a process
+# pool, and each one gets the whole room list, since they happen on
+# different days.
+
+# Each tournament's output goes to a directory named after its month in the
+# work directory, e.g. `nov/room_assignments.csv`, along with any extra
+# outputs (-O). A combined report with one row per tournament (its status,
+# the organizations with a team outside their individual building, seat
+# utilization and time) is written to `batch_report.csv`.
+
+# With the cache on, each tournament's result is cached by the hashes of its
+# input files and its options, so only tournaments whose inputs changed are
+# run again.
+
+
+#########################
+# Argument Requirements #
+#########################
+
+
+# MONTH, TEAM_CSV: one of each per tournament; the months must be different.
+
+# INDIV_ROOM: either one per tournament, or a single one for all of them
+#   (the default room if there are none).
+
+# WORKERS: the number of worker processes, one per CPU by default. Each
+#   tournament gets an equal share of the CPUs for the partition engine and
+#   the local search restarts, so by default these run in its own worker.
+
+# Everything else is as in `assign_rooms.py`.
+
+
+###########
+# Imports #
+###########
+
+
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import assign_rooms
+from assign_rooms import awards_policies, cache_modes, compute_assignments, \
+    engines, extra_outputs, get_awards_policy, get_budget, get_cache, \
+    get_engine, get_indiv_team_room, get_input_file, get_local_search, \
+    get_outputs, get_restarts, user_info, write_assignments
+from cache_rooms import load_input, open_cache, read_result, result_key, \
+    write_result
+from sweep_rooms import assignment_metrics, job_workers
+
+
+###########
+# Globals #
+###########
+
+
+batch_passed_in = {
+    "months": [],
+    "teams": [],
+    "indiv_rooms": [],
+    "workers": None
+}
+
+batch_report_headers = ["month", "teams", "indiv_room", "status",
+                        "split_orgs", "ind_utilization", "team_utilization",
+                        "seconds"]
+
+# set in each worker by `init_worker`
+shared_inputs = None
+
+# what a month's teams can trip over, e.g. a team of an organization that
+#   is not in ORGANIZATION_CSV, on top of the usual errors for inputs that
+#   cannot be assigned; these only fail that month
+tournament_errors = (RuntimeError, ValueError, KeyError, IndexError)
+
+
+#####################
+## Check Arguments ##
+#####################
+
+
+def print_help():
+    print("\nUsage: [ARGUMENTS]")
+
+    print("\nArgument Options:")
+    print("  -m MONTH                     A tournament's month (repeatable).")
+    print("  -t TEAM_CSV                  Its team info (repeatable).")
+    print("  -i INDIV_ROOM                Its individuals room (repeatable).")
+    print("  -r ROOM_CSV                  File containing room info.")
+    print("  -o ORGANIZATION_CSV          File containing organization info.")
+    print("  -p POWERINDEX_CSV            File containing power indices.")
+    print("  -e ENGINE                    Either greedy, flow or partition.")
+    print("  -b BUDGET                    Seconds the flow engine may take.")
+    print("  -c CACHE                     Either on, off or clear.")
+    print("  -A AWARDS_POLICY             Either spread or bestfit.")
+    print("  -l LOCAL_SEARCH_BUDGET       Seconds to spend improving.")
+    print("  -R RESTARTS                  Number of local searches to run.")
+    print("  -O OUTPUTS                   Extra outputs, e.g. rosters^jsonl.")
+    print("  -w WORKERS                   Number of worker processes.")
+
+    print("\nThe argument requirements can be found ")
+    print("at the top of `batch_rooms.py`.\n")
+    sys.exit()
+
+
+def parse_arguments():
+    if len(sys.argv) == 2 and sys.argv[1] == "-h":
+        print_help()
+
+    if len(sys.argv) % 2 == 0:
+        raise RuntimeError("Every argument must be preceded by a flag. " +
+                           "Use the -h flag to see all arguments/flags.")
+
+    file_flags = {"-r": "rooms", "-o": "orgs", "-p": "powerindices"}
+    value_flags = {"-e": "engine", "-b": "budget", "-c": "cache",
+                   "-A": "awards_policy", "-l": "local_search",
+                   "-R": "restarts", "-O": "outputs"}
+    batch_flags = {"-m": "months", "-t": "teams", "-i": "indiv_rooms"}
+
+    for index in range(len(sys.argv))[1::2]:
+        flag, value = sys.argv[index], sys.argv[index + 1]
+        if flag in file_flags or flag == "-t":
+            if not os.path.isfile(value):
+                raise ValueError("The file " + value +
+                                 " passed in is not valid.")
+
+        if flag in batch_flags:
+            batch_passed_in[batch_flags[flag]].append(value)
+        elif flag == "-w":
+            batch_passed_in["workers"] = int(value)
+        elif flag in file_flags:
+            assign_rooms.passed_in[file_flags[flag]] = value
+        elif flag in value_flags:
+            if flag == "-e" and value not in engines:
+                raise ValueError("The engine must be one of " +
+                                 ", ".join(engines) + ".")
+            if flag == "-c" and value not in cache_modes:
+                raise ValueError("The cache must be one of " +
+                                 ", ".join(cache_modes) + ".")
+            if flag == "-A" and value not in awards_policies:
+                raise ValueError("The awards policy must be one of " +
+                                 ", ".join(awards_policies) + ".")
+            if flag == "-O" and not set(value.split("^")) <= \
+               set(extra_outputs):
+                raise ValueError("The outputs must be among " +
+                                 ", ".join(extra_outputs) + ".")
+            assign_rooms.passed_in[value_flags[flag]] = value
+        else:
+            raise RuntimeError("You used an invalid flag. " +
+                               "Use the -h flag to see all arguments/flags.")
+
+
+# the tournaments, as (month, team file, individuals room)
+def get_tournaments():
+    months = batch_passed_in["months"]
+    teams = batch_passed_in["teams"]
+    indiv_rooms = batch_passed_in["indiv_rooms"] or [get_indiv_team_room()]
+
+    if not months or len(months) != len(teams):
+        raise ValueError("Every tournament needs both a month and a team " +
+                         "file.")
+    if len(set(months)) != len(months):
+        raise ValueError("The months must be different.")
+    if len(indiv_rooms) == 1:
+        indiv_rooms = indiv_rooms * len(months)
+    if len(indiv_rooms) != len(months):
+        raise ValueError("There must be one individuals room, or one for " +
+                         "each tournament.")
+    return list(zip(months, teams, indiv_rooms))
+
+
+#################
+## Tournaments ##
+#################
+
+
+def init_worker(inputs):
+    global shared_inputs
+    shared_inputs = inputs
+
+
+# returns the rows to write along with the row of the combined report
+def run_tournament(tournament):
+    month, teams, indiv_room = tournament
+    inputs = shared_inputs
+
+    start = time.perf_counter()
+    result = {
+        "month": month,
+        "teams": len(teams),
+        "indiv_room": indiv_room,
+        "status": "ok",
+        "split_orgs": 0,
+        "ind_utilization": 0,
+        "team_utilization": 0,
+        "rows": None,
+        "diff": None
+    }
+    try:
+        assignments = compute_assignments(
+            teams, inputs["orgs"], inputs["powerindices"], inputs["rooms"],
+            month, indiv_room, engine=inputs["engine"],
+            budget=inputs["budget"], awards_policy=inputs["awards_policy"],
+            local_search=inputs["local_search"],
+            restarts=inputs["restarts"], workers=inputs["job_workers"])
+        result.update(assignment_metrics(assignments))
+        result["rows"] = assignments["rows"]
+    except tournament_errors as error:
+        result["status"] = "failed: " + type(error).__name__ + ": " + \
+            str(error)
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def tournament_cache_key(inputs, tournament):
+    month, teams_name, indiv_room = tournament
+    return result_key([teams_name] + inputs["files"],
+                      [month, indiv_room, inputs["engine"], inputs["budget"],
+                       inputs["awards_policy"], inputs["local_search"],
+                       inputs["restarts"], inputs["job_workers"]])
+
+
+# `tournaments` hold the name of each team file, and `teams` maps it to the
+#   parsed teams; pass a `cache_dir` to reuse (and store) earlier results
+def run_batch(inputs, tournaments, teams, workers=None, cache_dir=None):
+    workers = workers or os.cpu_count()
+    inputs = dict(inputs, job_workers=job_workers(workers))
+    results = {}
+    pending = tournaments
+    if cache_dir is not None:
+        pending = []
+        for tournament in tournaments:
+            result = read_result(cache_dir, "batch",
+                                 tournament_cache_key(inputs, tournament))
+            if result is None:
+                pending.append(tournament)
+            else:
+                results[tournament] = result
+
+    jobs = [(month, teams[name], indiv_room)
+            for month, name, indiv_room in pending]
+    if len(jobs) == 1:
+        init_worker(inputs)
+        new_results = [run_tournament(jobs[0])]
+    elif jobs:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=init_worker,
+                                 initargs=(inputs,)) as executor:
+            new_results = list(executor.map(run_tournament, jobs))
+    else:
+        new_results = []
+
+    for tournament, result in zip(pending, new_results):
+        results[tournament] = result
+        if cache_dir is not None:
+            write_result(cache_dir, "batch",
+                         tournament_cache_key(inputs, tournament), result)
+    return [results[x] for x in tournaments]
+
+
+def write_batch_outputs(results, work_dir, run_script, outputs):
+    for result in results:
+        if result["status"] != "ok":
+            continue
+        month_dir = os.path.join(work_dir, result["month"])
+        os.makedirs(month_dir, exist_ok=True)
+        write_assignments(result, month_dir, run_script, outputs)
+
+
+def write_batch_report(results, work_dir):
+    with open(work_dir + "/batch_report.csv", "w") as file:
+        writer = csv.writer(file)
+        writer.writerow(batch_report_headers)
+        for result in results:
+            writer.writerow([result[x] for x in batch_report_headers])
+
+
+########
+# Main #
+########
+
+
+if __name__ == '__main__':
+    parse_arguments()
+    tournaments = get_tournaments()
+
+    cache_dir = open_cache(get_cache(), user_info.work_dir)
+    inputs = {
+        "orgs": load_input("orgs", get_input_file("orgs"), cache_dir),
+        "powerindices": load_input("powerindices",
+                                   get_input_file("powerindices"), cache_dir),
+        "rooms": load_input("rooms", get_input_file("rooms"), cache_dir),
+        "files": [get_input_file(x) for x in ["orgs", "powerindices",
+                                              "rooms"]],
+        "engine": get_engine(),
+        "budget": get_budget(),
+        "awards_policy": get_awards_policy(),
+        "local_search": get_local_search(),
+        "restarts": get_restarts()
+    }
+    teams = {x: load_input("teams", x, cache_dir)
+             for x in batch_passed_in["teams"]}
+
+    results = run_batch(inputs, tournaments, teams,
+                        batch_passed_in["workers"], cache_dir)
+    write_batch_outputs(results, user_info.work_dir, " ".join(sys.argv),
+                        get_outputs())
+    write_batch_report(results, user_info.work_dir)
+
+    for result in results:
+        print(result["month"] + ": " + result["status"] + " (" +
+              str(result["teams"]) + " teams, " +
+              "%.3f" % result["seconds"] + " s).")
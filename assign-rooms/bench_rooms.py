@@ -0,0 +1,390 @@
+###########################
+# Some High Level Details #
+###########################
+
+
+# Measures how `assign_rooms.py` scales with the number of registered teams.
+# For every size passed in with -n, it generates a synthetic tournament
+# (teams, organizations, power indices and rooms CSVs that follow the rules
+# and assumptions at the top of `assign_rooms.py`), parses it, assigns it,
+# and records the seconds spent loading each input and in each phase of the
+# assignment, the throughput in teams per second and the peak memory.
+
+# Peak memory comes from a second run under `tracemalloc`, since tracing
+# slows everything down and would skew the timings.
+
+# The results are written to `bench_report.json` in the work directory, so
+# that runs can be compared across changes.
+
+
+#########################
+# Argument Requirements #
+#########################
+
+
+# SIZES: the numbers of teams to benchmark, delimited by a "^", e.g.
+#   "100^1000^10000".
+
+# SEED: the seed for the generator; the same seed and options always produce
+#   the same tournament.
+
+# ORG_SIZE_WEIGHTS: the relative number of organizations with 1, 2, 3, ...
+#   teams, delimited by a "^", e.g. "35^25^15^12^8^5".
+
+# POWER_DENSITY: the fraction of teams that are power teams, e.g. "0.05".
+
+# SLACK: the spare capacity in every round as a fraction of the number of
+#   teams, e.g. "0.3" books 30% more seats than needed.
+
+# ENGINE, BUDGET: as in `assign_rooms.py`.
+
+# GENERATE_DIR: if passed in, the generated CSVs are kept there (one
+#   directory per size) instead of being thrown away.
+
+
+###########
+# Imports #
+###########
+
+
+import csv
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import assign_rooms
+from assign_rooms import compute_assignments, engines, get_budget, \
+    get_engine, individual_org_name, orgs_file_to_list, \
+    powerindices_file_to_object, rooms_file_to_list, teams_file_to_list, \
+    user_info
+
+
+###########
+# Globals #
+###########
+
+
+bench_default = {
+    "sizes": "100^1000^10000^100000",
+    "seed": "2016",
+    "weights": "35^25^15^12^8^5",
+    "power_density": "0.05",
+    "slack": "0.3",
+    "generate_dir": None
+}
+
+bench_passed_in = {
+    "sizes": None,
+    "seed": None,
+    "weights": None,
+    "power_density": None,
+    "slack": None,
+    "generate_dir": None
+}
+
+indiv_building_name = "Individuals Hall"
+
+# choices for the capacities of generated rooms; individual rooms are always
+#   larger than team rooms, and awards halls are always larger than their
+#   guts capacity (see the assumptions at the top of `assign_rooms.py`)
+indcap_choices = [30, 40, 60, 80, 120]
+teamcap_choices = [4, 6, 8, 10, 12]
+awardscap_choices = [300, 400, 500]
+guts_margin_choices = [50, 100, 150]
+rooms_per_building = 25
+
+# see NUMBER OF INDIVIDUAL TEAMS at the top of `assign_rooms.py`
+indiv_team_count = 4
+
+# the order the input files are loaded in, with their parsers
+input_loaders = [
+    ("teams", teams_file_to_list),
+    ("orgs", orgs_file_to_list),
+    ("powerindices", powerindices_file_to_object),
+    ("rooms", rooms_file_to_list)
+]
+
+
+#####################
+## Check Arguments ##
+#####################
+
+
+def print_help():
+    print("\nUsage: [ARGUMENTS]")
+
+    print("\nArgument Options:")
+    print("  -n SIZES                     Numbers of teams to benchmark.")
+    print("  -s SEED                      Seed for the generator.")
+    print("  -w ORG_SIZE_WEIGHTS          Weights of organization sizes.")
+    print("  -p POWER_DENSITY             Fraction of teams that are power " +
+          "teams.")
+    print("  -k SLACK                     Spare capacity per round.")
+    print("  -e ENGINE                    Either greedy, flow or partition.")
+    print("  -b BUDGET                    Seconds the flow engine may take.")
+    print("  -g GENERATE_DIR              Keep the generated CSVs here.")
+
+    print("\nThe argument requirements can be found ")
+    print("at the top of `bench_rooms.py`.\n")
+    sys.exit()
+
+
+def parse_arguments():
+    if len(sys.argv) == 2 and sys.argv[1] == "-h":
+        print_help()
+
+    if len(sys.argv) % 2 == 0:
+        raise RuntimeError("Every argument must be preceded by a flag. " +
+                           "Use the -h flag to see all arguments/flags.")
+
+    bench_flags = {"-n": "sizes", "-s": "seed", "-w": "weights",
+                   "-p": "power_density", "-k": "slack",
+                   "-g": "generate_dir"}
+    value_flags = {"-e": "engine", "-b": "budget"}
+
+    for index in range(len(sys.argv))[1::2]:
+        flag, value = sys.argv[index], sys.argv[index + 1]
+        if flag in bench_flags:
+            bench_passed_in[bench_flags[flag]] = value
+        elif flag in value_flags:
+            if flag == "-e" and value not in engines:
+                raise ValueError("The engine must be one of " +
+                                 ", ".join(engines) + ".")
+            assign_rooms.passed_in[value_flags[flag]] = value
+        else:
+            raise RuntimeError("You used an invalid flag. " +
+                               "Use the -h flag to see all arguments/flags.")
+
+
+def get_bench_option(option):
+    if bench_passed_in[option] is not None:
+        return bench_passed_in[option]
+    return bench_default[option]
+
+
+def get_sizes():
+    return [int(x) for x in get_bench_option("sizes").split("^")]
+
+
+def get_weights():
+    return [float(x) for x in get_bench_option("weights").split("^")]
+
+
+###############
+## Generator ##
+###############
+
+
+# returns the rows of the four input files for a tournament of roughly
+#   `team_count` teams (organizations are never split, so the last one may
+#   overshoot); the individuals organization is always organization 1
+def generate_tournament(team_count, weights, power_density, slack, rng):
+    sizes = list(range(1, len(weights) + 1))
+
+    orgs = [[1, individual_org_name]]
+    org_teams = {1: list(range(1, indiv_team_count + 1))}
+    teamid = indiv_team_count + 1
+    while teamid <= team_count:
+        orgid = len(orgs) + 1
+        size = rng.choices(sizes, weights)[0]
+        orgs.append([orgid, "Organization " + str(orgid)])
+        org_teams[orgid] = list(range(teamid, teamid + size))
+        teamid += size
+    team_total = teamid - 1
+
+    teams = []
+    for orgid, teamids in org_teams.items():
+        for team in teamids:
+            teams.append([orgid, team, "Team " + str(team), "T" + str(team)])
+    rng.shuffle(teams)
+
+    # power teams come from the organizations that placed last year, one or
+    #   two per organization
+    powerindices = []
+    power_needed = round(power_density * team_total)
+    candidates = list(org_teams)[1:]
+    rng.shuffle(candidates)
+    for orgid in candidates:
+        if power_needed <= 0:
+            break
+        teamids = org_teams[orgid][:min(rng.randint(1, 2), power_needed)]
+        power_needed -= len(teamids)
+        powerindices.append([orgid, rng.randint(1, 25),
+                             "^".join(str(x) for x in teamids)])
+
+    # every organization needs as many team rooms as it has teams, and every
+    #   power team needs a team room of its own
+    booked = team_total * (1 + slack)
+    rooms = [[indiv_building_name, "1", indiv_team_count, indiv_team_count,
+              0, 0]]
+    indcap = teamcap = team_rooms = 0
+    largest = max(len(x) for x in org_teams.values())
+    power_teams = round(power_density * team_total)
+    while indcap < booked or teamcap < booked or \
+            team_rooms < max(largest, power_teams) * (1 + slack):
+        room = [rng.choice(indcap_choices) if indcap < booked else 0,
+                rng.choice(teamcap_choices)]
+        indcap += room[0]
+        teamcap += room[1]
+        team_rooms += 1
+        number = len(rooms) - 1
+        rooms.append(["Building " + str(number // rooms_per_building),
+                      str(100 + number % rooms_per_building)] + room +
+                     [0, 0])
+
+    awardscap = gutscap = 0
+    while awardscap < booked or gutscap < booked:
+        awards = rng.choice(awardscap_choices)
+        guts = awards - rng.choice(guts_margin_choices)
+        awardscap += awards
+        gutscap += guts
+        rooms.append(["Hall " + str(len(rooms)), "Main", 0, 0, guts,
+                      awards])
+
+    rng.shuffle(rooms)
+    return {
+        "teams": teams,
+        "orgs": orgs,
+        "powerindices": powerindices,
+        "rooms": rooms,
+        "indiv_room": indiv_building_name + "^1"
+    }
+
+
+def write_tournament(tournament, directory):
+    headers = {
+        "teams": ["orgid", "teamid", "teamname", "shortname"],
+        "orgs": ["id", "name"],
+        "powerindices": ["orgid", "powerindex", "teamids"],
+        "rooms": ["building", "number", "indcap", "teamcap", "gutscap",
+                  "awardscap"]
+    }
+
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for kind in headers:
+        paths[kind] = os.path.join(directory, kind + ".csv")
+        with open(paths[kind], "w") as file:
+            writer = csv.writer(file)
+            writer.writerow(headers[kind])
+            writer.writerows(tournament[kind])
+    return paths
+
+
+###############
+## Benchmark ##
+###############
+
+
+def load_inputs(paths, timings):
+    inputs = {}
+    for kind, loader in input_loaders:
+        start = time.perf_counter()
+        inputs[kind] = loader(paths[kind])
+        timings[kind] = time.perf_counter() - start
+    return inputs
+
+
+def run_assignment(inputs, indiv_room, engine, budget, timings=None):
+    return compute_assignments(
+        inputs["teams"], inputs["orgs"], inputs["powerindices"],
+        inputs["rooms"], "feb", indiv_room, engine=engine, budget=budget,
+        timings=timings)
+
+
+def bench_size(team_count, directory, options):
+    rng = random.Random(str(options["seed"]) + "^" + str(team_count))
+    tournament = generate_tournament(team_count, options["weights"],
+                                     options["power_density"],
+                                     options["slack"], rng)
+    paths = write_tournament(tournament, directory)
+
+    result = {
+        "requested_teams": team_count,
+        "teams": len(tournament["teams"]),
+        "organizations": len(tournament["orgs"]),
+        "power_teams": sum(len(x[2].split("^"))
+                           for x in tournament["powerindices"]),
+        "rooms": len(tournament["rooms"]),
+        "status": "ok",
+        "load": {},
+        "phases": {}
+    }
+
+    start = time.perf_counter()
+    inputs = load_inputs(paths, result["load"])
+    try:
+        run_assignment(inputs, tournament["indiv_room"], options["engine"],
+                       options["budget"], result["phases"])
+    except (RuntimeError, ValueError) as error:
+        result["status"] = "failed: " + str(error)
+    result["seconds"] = time.perf_counter() - start
+    result["teams_per_second"] = result["teams"] / result["seconds"]
+
+    # a second, traced run for the memory high-water mark
+    tracemalloc.start()
+    try:
+        inputs = load_inputs(paths, {})
+        run_assignment(inputs, tournament["indiv_room"], options["engine"],
+                       options["budget"])
+    except (RuntimeError, ValueError):
+        pass
+    result["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return result
+
+
+def run_bench(options):
+    results = []
+    generate_dir = options["generate_dir"]
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        for team_count in options["sizes"]:
+            directory = os.path.join(generate_dir or scratch_dir,
+                                     "teams_" + str(team_count))
+            results.append(bench_size(team_count, directory, options))
+    return results
+
+
+def write_bench_report(options, results, work_dir):
+    report = {
+        "python": platform.python_version(),
+        "options": options,
+        "results": results
+    }
+    with open(work_dir + "/bench_report.json", "w") as file:
+        json.dump(report, file, indent=2)
+
+
+########
+# Main #
+########
+
+
+if __name__ == '__main__':
+    parse_arguments()
+
+    options = {
+        "sizes": get_sizes(),
+        "seed": get_bench_option("seed"),
+        "weights": get_weights(),
+        "power_density": float(get_bench_option("power_density")),
+        "slack": float(get_bench_option("slack")),
+        "engine": get_engine(),
+        "budget": get_budget(),
+        "generate_dir": get_bench_option("generate_dir")
+    }
+
+    results = run_bench(options)
+    write_bench_report(options, results, user_info.work_dir)
+
+    for result in results:
+        print(str(result["teams"]) + " teams: " + result["status"] + ", " +
+              "%.3f" % result["seconds"] + " s, " +
+              "%.0f" % result["teams_per_second"] + " teams/s, " +
+              "%.1f" % (result["peak_memory_bytes"] / 2 ** 20) + " MiB")
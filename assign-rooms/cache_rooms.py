@@ -0,0 +1,225 @@
+###########################
+# Some High Level Details #
+###########################
+
+
+# A cache of parsed inputs, so repeated runs with unchanged CSVs skip the
+# parsing. Each input file is hashed by content, and its parsed records are
+# stored as a pickle named after the kind of input and the hash, e.g.
+# `rooms-[SHA256].pickle`, in `.assign_cache` under the work directory.
+
+# Finished assignments are cached the same way, keyed by the hashes of all
+# the input files together with every option that changes the result, so a
+# repeated run with the same CSVs and flags writes the stored rows straight
+# away without parsing anything. `sweep_rooms.py` caches each scenario's
+# results the same way. Runs whose result depends on the clock (the flow
+# engine and the local search) are cached like any other, so the first
+# result is the one that sticks.
+
+# Reading an entry touches it, and writing one evicts the least recently
+# used entries of the same kind beyond that kind's limit in `cache_limits`,
+# so a sweep of hundreds of scenarios keeps its results, and never pushes
+# out the parsed inputs. The input entries a process has used are never
+# evicted while it runs. A corrupt or outdated entry is treated as a miss.
+# Bump `cache_version` whenever the records change shape. `-c clear` empties
+# the cache before the run.
+
+
+###########
+# Imports #
+###########
+
+
+import hashlib
+import os
+import pickle
+import tempfile
+
+from assign_rooms import orgs_file_to_list, powerindices_file_to_object, \
+    rooms_file_to_list, teams_file_to_list
+
+
+###########
+# Globals #
+###########
+
+
+cache_dir_name = ".assign_cache"
+
+# how many entries of each kind to keep; a sweep or a batch stores one
+#   entry per scenario or tournament
+cache_limits = {
+    "teams": 16,
+    "orgs": 16,
+    "powerindices": 16,
+    "rooms": 16,
+    "result": 32,
+    "sweep": 1024,
+    "batch": 128
+}
+
+default_cache_limit = 32
+
+# the input entries this process has read or written, which the current run
+#   (or sweep) may still need
+pinned_entries = set()
+
+cache_version = "1"
+
+# the parts of an assignment (see `compute_assignments`) that are cached;
+#   enough to write the output files again
+result_fields = ["month", "rows", "diff"]
+
+input_parsers = {
+    "teams": teams_file_to_list,
+    "orgs": orgs_file_to_list,
+    "powerindices": powerindices_file_to_object,
+    "rooms": rooms_file_to_list
+}
+
+
+#############
+## Hashing ##
+#############
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint(parts):
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+#############
+## Entries ##
+#############
+
+
+def cache_path(cache_dir, kind, key):
+    return os.path.join(cache_dir, kind + "-" + key + ".pickle")
+
+
+def read_cache(path):
+    try:
+        with open(path, "rb") as file:
+            value = pickle.load(file)
+        os.utime(path)
+        return value
+    except (OSError, EOFError, AttributeError, ImportError,
+            pickle.UnpicklingError):
+        return None
+
+
+# written to a temporary file first so that a reader never sees half of an
+#   entry
+def write_cache(path, value, kind):
+    cache_dir = os.path.dirname(path)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    descriptor, temp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    with os.fdopen(descriptor, "wb") as file:
+        pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)
+
+    evict_cache(cache_dir, kind)
+
+
+def remove_entries(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# only looks at the modification times once there are too many entries of
+#   the kind, so that writing stays cheap
+def evict_cache(cache_dir, kind):
+    limit = cache_limits.get(kind, default_cache_limit)
+    entries = [os.path.join(cache_dir, x) for x in os.listdir(cache_dir)
+               if x.startswith(kind + "-") and x.endswith(".pickle")]
+    if len(entries) <= limit:
+        return
+
+    unpinned = [x for x in entries if x not in pinned_entries]
+    unpinned.sort(key=os.path.getmtime, reverse=True)
+    remove_entries(unpinned[max(limit - len(entries) + len(unpinned), 0):])
+
+
+############
+## Inputs ##
+############
+
+
+# returns the parsed contents of an input file (see `input_parsers`),
+#   reading them from the cache when the file has not changed; pass
+#   `cache_dir=None` to always parse
+def load_input(kind, path, cache_dir):
+    if cache_dir is None:
+        return input_parsers[kind](path)
+
+    entry = cache_path(cache_dir, kind,
+                       fingerprint([cache_version, file_digest(path)]))
+    pinned_entries.add(entry)
+    value = read_cache(entry)
+    if value is None:
+        value = input_parsers[kind](path)
+        write_cache(entry, value, kind)
+    return value
+
+
+def default_cache_dir(work_dir):
+    return os.path.join(work_dir, cache_dir_name)
+
+
+#############
+## Results ##
+#############
+
+
+# `paths` are the input files and `options` everything else that changes
+#   the result, in a fixed order
+def result_key(paths, options):
+    return fingerprint([cache_version] + [file_digest(x) for x in paths] +
+                       [str(x) for x in options])
+
+
+def read_result(cache_dir, kind, key):
+    return read_cache(cache_path(cache_dir, kind, key))
+
+
+def write_result(cache_dir, kind, key, value):
+    write_cache(cache_path(cache_dir, kind, key), value, kind)
+
+
+def assignment_result(assignments):
+    return {x: assignments[x] for x in result_fields}
+
+
+##################
+## Invalidation ##
+##################
+
+
+def clear_cache(cache_dir):
+    if os.path.isdir(cache_dir):
+        remove_entries([os.path.join(cache_dir, x)
+                        for x in os.listdir(cache_dir)
+                        if x.endswith(".pickle")])
+
+
+# the cache directory for a CACHE option (see the top of `assign_rooms.py`),
+#   or None if caching is off
+def open_cache(mode, work_dir):
+    if mode == "off":
+        return None
+
+    cache_dir = default_cache_dir(work_dir)
+    if mode == "clear":
+        clear_cache(cache_dir)
+    return cache_dir
@@ -0,0 +1,180 @@
+###########################
+# Some High Level Details #
+###########################
+
+
+# Extra views of the rows in `room_assignments.csv`, selected with
+# `-O OUTPUTS` in `assign_rooms.py`:
+
+# - "rosters": for every round (team, individual, guts and awards), a
+#   roster of the teams in each room, as `room_rosters/[ROUND]/[BUILDING]/
+#   [ROOM].csv`, and of each building, as `room_rosters/[ROUND]/
+#   [BUILDING].csv`;
+# - "jsonl": every row as a JSON object keyed by the output headers, one
+#   per line, as `room_assignments.jsonl`.
+
+# The rows come out of `assignment_rows` sorted by team building, and are
+# never sorted again: a single pass files each row under its room for every
+# round, and every roster is written from that index (within a room, rows
+# keep their order). Only the room names are sorted.
+
+# The rosters are written to a temporary directory that then replaces
+# `room_rosters`, so rooms that are no longer used do not leave stale files
+# behind. Building and room names are made safe for file names; names that
+# end up the same (ignoring case, as some file systems do) are numbered,
+# e.g. `Hall_A.csv` and `Hall_A_2.csv`.
+
+
+###########
+# Imports #
+###########
+
+
+import csv
+import io
+import json
+import os
+import re
+import shutil
+
+from assign_rooms import room_assignment_headers
+
+
+###########
+# Globals #
+###########
+
+
+roster_dir_name = "room_rosters"
+
+jsonl_name = "room_assignments.jsonl"
+
+# every round, with the column of its building in the output rows (the room
+#   is the next column)
+roster_rounds = [("team", 4), ("individual", 7), ("guts", 9), ("awards", 11)]
+
+roster_headers = ["building", "room", "orgid", "orgname", "teamid",
+                  "teamname", "shortname"]
+
+
+#############
+## Rosters ##
+#############
+
+
+def file_name(name):
+    return re.sub(r"[^A-Za-z0-9.-]+", "_", str(name))
+
+
+# the file names for `names`, in order, with a number added to any that
+#   would clash with an earlier one
+def unique_file_names(names):
+    taken = set()
+    unique = {}
+    for name in names:
+        base = candidate = file_name(name)
+        number = 2
+        while candidate.lower() in taken:
+            candidate = base + "_" + str(number)
+            number += 1
+        taken.add(candidate.lower())
+        unique[name] = candidate
+    return unique
+
+
+# for every round, the rows filed under their (building, room), in one pass
+def roster_index(rows):
+    index = {x: {} for x, _ in roster_rounds}
+    for row in rows:
+        for round, column in roster_rounds:
+            if row[column] is None:
+                continue
+            room_key = (row[column], row[column + 1])
+            room_rows = index[round].get(room_key)
+            if room_rows is None:
+                room_rows = index[round][room_key] = []
+            room_rows.append(row)
+    return index
+
+
+def roster_row(row, column):
+    return [row[column], row[column + 1], row[0], row[6], row[1], row[2],
+            row[3]]
+
+
+def csv_text(rows):
+    text = io.StringIO()
+    csv.writer(text).writerows(rows)
+    return text.getvalue()
+
+
+# each room's roster is formatted once, and the text goes to both the room
+#   file and the building file
+def write_round_rosters(round_dir, room_index, column):
+    buildings = {}
+    for building, room in sorted(room_index):
+        buildings.setdefault(building, []).append(room)
+
+    header = csv_text([roster_headers])
+    building_names = unique_file_names(buildings)
+    for building, rooms in buildings.items():
+        building_dir = os.path.join(round_dir, building_names[building])
+        os.makedirs(building_dir)
+        room_names = unique_file_names(rooms)
+
+        with open(building_dir + ".csv", "w") as building_file:
+            building_file.write(header)
+            for room in rooms:
+                roster = csv_text([roster_row(x, column)
+                                   for x in room_index[(building, room)]])
+                building_file.write(roster)
+
+                room_path = os.path.join(building_dir, room_names[room])
+                with open(room_path + ".csv", "w") as room_file:
+                    room_file.write(header + roster)
+
+
+def write_rosters(rows, work_dir):
+    roster_dir = os.path.join(work_dir, roster_dir_name)
+    temp_dir = roster_dir + ".tmp"
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+    index = roster_index(rows)
+    for round, column in roster_rounds:
+        write_round_rosters(os.path.join(temp_dir, round), index[round],
+                            column)
+
+    shutil.rmtree(roster_dir, ignore_errors=True)
+    os.replace(temp_dir, roster_dir)
+
+
+################
+## JSON Lines ##
+################
+
+
+def write_jsonl(rows, work_dir):
+    path = os.path.join(work_dir, jsonl_name)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as file:
+        for row in rows:
+            file.write(json.dumps(dict(zip(room_assignment_headers, row))) +
+                       "\n")
+    os.replace(temp_path, path)
+
+
+############
+## Export ##
+############
+
+
+export_writers = {
+    "rosters": write_rosters,
+    "jsonl": write_jsonl
+}
+
+
+# `outputs` are any of `extra_outputs` in `assign_rooms.py`
+def write_exports(rows, work_dir, outputs):
+    for output in outputs:
+        export_writers[output](rows, work_dir)
@@ -0,0 +1,161 @@
+###########################
+# Some High Level Details #
+###########################
+
+
+# A quick check, run before any assignment pass, for inputs that cannot
+# possibly be assigned. It only looks at totals and sorted sizes, so it
+# takes a few milliseconds even for very large tournaments, and it never
+# rejects inputs that have an assignment. Passing it does not promise that
+# the greedy passes will succeed, only that nothing obvious is missing.
+
+# For the rounds where an organization sits in a single room (individual,
+# guts and awards), it checks that:
+
+# - there are enough seats in total;
+# - every organization fits in the largest room;
+# - more generally, for every k, the organizations that are too large for
+#   all but the k largest rooms fit in those k rooms together.
+
+# For the team round, it checks that there are enough seats in total, that
+# every organization has as many team rooms as teams, and that there is a
+# team room for every power team.
+
+# The individuals organization is counted in the room passed in with -i for
+# the individual and team rounds, and like everyone else for guts and
+# awards.
+
+
+###########
+# Imports #
+###########
+
+
+from assign_rooms import find_room
+
+
+###########
+# Globals #
+###########
+
+
+# the rounds where an organization sits in a single room, and the room
+#   field holding each round's capacity
+org_round_caps = [("individual", "indcap"), ("guts", "gutscap"),
+                  ("awards", "awardscap")]
+
+
+############
+## Bounds ##
+############
+
+
+# `sizes` and `caps` are sorted in decreasing order; returns the problems
+#   found for one round
+def packing_problems(round, sizes, caps):
+    if not sizes:
+        return []
+    if not caps:
+        return [round + ": there are no " + round + " rooms."]
+
+    problems = []
+    if sum(sizes) > sum(caps):
+        problems.append(round + ": " + str(sum(sizes)) + " teams need seats " +
+                        "but there are only " + str(sum(caps)) + ".")
+    if sizes[0] > caps[0]:
+        problems.append(round + ": the largest organization has " +
+                        str(sizes[0]) + " teams but the largest room " +
+                        "only seats " + str(caps[0]) + ".")
+        return problems
+
+    # organizations larger than the (k + 1)-th largest room can only sit in
+    #   the k largest rooms
+    large = 0
+    large_total = 0
+    seats = 0
+    for k in range(1, len(caps)):
+        seats += caps[k - 1]
+        while large < len(sizes) and sizes[large] > caps[k]:
+            large_total += sizes[large]
+            large += 1
+        if large_total > seats:
+            problems.append(round + ": the " + str(large) + " organizations " +
+                            "with more than " + str(caps[k]) + " teams " +
+                            "need " + str(large_total) + " seats in the " +
+                            str(k) + " largest rooms, which only seat " +
+                            str(seats) + ".")
+            break
+    return problems
+
+
+def team_problems(orgs, team_caps):
+    teams = sum(x.number_of_teams for x in orgs)
+    power_teams = sum(1 for org in orgs for team in org.teams
+                      if team.powerindex is not None)
+    team_rooms = sum(1 for x in team_caps if x > 0)
+
+    problems = []
+    if teams > sum(team_caps):
+        problems.append("team: " + str(teams) + " teams need seats but " +
+                        "there are only " + str(sum(team_caps)) + ".")
+    largest = max([x.number_of_teams for x in orgs] + [0])
+    if largest > team_rooms:
+        problems.append("team: the largest organization has " +
+                        str(largest) + " teams but there are only " +
+                        str(team_rooms) + " team rooms.")
+    if power_teams > team_rooms:
+        problems.append("team: there are " + str(power_teams) + " power " +
+                        "teams but only " + str(team_rooms) +
+                        " team rooms.")
+    return problems
+
+
+###########
+## Check ##
+###########
+
+
+# returns a list of problems, which is empty if nothing rules the inputs out
+def feasibility_problems(organizations, rooms, buildings, indiv_room_string):
+    indiv_org = organizations[0]
+    orgs = organizations[1:]
+
+    indcaps = [x.indcap for x in rooms]
+    teamcaps = [x.teamcap for x in rooms]
+
+    problems = []
+    building_name, number = indiv_room_string.split("^")
+    try:
+        indiv_room = find_room(buildings, building_name, number)
+    except ValueError as error:
+        problems.append("individuals: " + str(error))
+    else:
+        if indiv_room.indcap < indiv_org.number_of_teams or \
+           indiv_room.teamcap < indiv_org.number_of_teams:
+            problems.append("individuals: the room " + building_name + " " +
+                            number + " cannot hold all " +
+                            str(indiv_org.number_of_teams) +
+                            " individual teams.")
+        else:
+            indcaps[indiv_room.id] -= indiv_org.number_of_teams
+            teamcaps[indiv_room.id] -= indiv_org.number_of_teams
+
+    for round, cap in org_round_caps:
+        round_orgs = orgs if round == "individual" else organizations
+        caps = indcaps if round == "individual" else \
+            [getattr(x, cap) for x in rooms]
+        problems += packing_problems(
+            round, sorted([x.number_of_teams for x in round_orgs],
+                          reverse=True),
+            sorted([x for x in caps if x > 0], reverse=True))
+
+    problems += team_problems(orgs, teamcaps)
+    return problems
+
+
+def check_feasibility(organizations, rooms, buildings, indiv_room_string):
+    problems = feasibility_problems(organizations, rooms, buildings,
+                                    indiv_room_string)
+    if problems:
+        raise RuntimeError("The inputs cannot be assigned:\n  " +
+                           "\n  ".join(problems))
@@ -0,0 +1,465 @@
+###########################
+# Some High Level Details #
+###########################
+
+
+# An alternative to the greedy passes in `assign_rooms.py`, selected with
+# `-e flow`. It follows the same rules (see the top of `assign_rooms.py`),
+# but solves each stage as an optimization problem instead of taking the
+# first room that fits:
+
+# - individual, awards and guts rooms are a bin packing problem (every
+#   organization must fit in a single room), solved with a backtracking
+#   search over organizations in decreasing size;
+# - team rooms are a min-cost flow from organizations to rooms, where each
+#   organization sends at most one team to a room and a team costs 1 if it
+#   is outside its organization's individual building. Power teams are
+#   routed first, through rooms that can take at most one of them.
+
+# An organization is only offered the open rooms of its individual
+# building and `flow_room_choices` others (or as many as it has teams, if
+# that is more). The others are taken in turn from the open rooms sorted by
+# free seats, so every room is offered to some organizations, and the graph
+# grows with the number of organizations instead of organizations times
+# rooms. Since every room outside the building costs the same, this only
+# loses the best assignment when it runs out of rooms to offer.
+
+# Everything runs under a single wall-clock budget, which is checked while
+# packing, while building the flow graph and inside every augmentation
+# phase. If the budget runs out, or a stage has no solution, `assign_flow`
+# returns None and the caller falls back to the greedy passes.
+
+
+###########
+# Imports #
+###########
+
+
+import heapq
+import time
+from collections import deque
+
+from assign_rooms import assign_team_room, awards_key
+
+
+###########
+# Globals #
+###########
+
+
+# how many search steps to take between checks of the clock
+deadline_check_interval = 1024
+
+# how many rooms outside its individual building an organization is offered
+#   in the team flow
+flow_room_choices = 32
+
+infinity = float("inf")
+
+
+#################
+## Bin Packing ##
+#################
+
+
+# returns a room index (into `free`, the free seats in each room) for every
+#   organization so that no room overflows, or None if there is no packing
+#   or we ran out of time
+def pack_organizations(orgs, free, deadline):
+    free = list(free)
+
+    order = sorted(range(len(orgs)),
+                   key=lambda x: -orgs[x].number_of_teams)
+    sizes = [orgs[x].number_of_teams for x in order]
+
+    if sum(sizes) > sum(x for x in free if x > 0):
+        return None
+
+    # choice[depth] is the room the organization at that depth sits in, and
+    #   tried[depth] holds the free capacities already tried there (two rooms
+    #   with the same free capacity are interchangeable)
+    choice = [-1] * len(order)
+    tried = [set() for _ in order]
+
+    depth = 0
+    steps = 0
+    while 0 <= depth < len(order):
+        size = sizes[depth]
+        if choice[depth] >= 0:
+            free[choice[depth]] += size
+
+        next_room = -1
+        for room_index in range(choice[depth] + 1, len(free)):
+            if free[room_index] >= size and \
+               free[room_index] not in tried[depth]:
+                next_room = room_index
+                break
+
+        if next_room < 0:
+            choice[depth] = -1
+            tried[depth] = set()
+            depth -= 1
+            continue
+
+        tried[depth].add(free[next_room])
+        free[next_room] -= size
+        choice[depth] = next_room
+        depth += 1
+
+        steps += 1
+        if steps % deadline_check_interval == 0 and \
+           time.monotonic() > deadline:
+            return None
+
+    if depth < 0:
+        return None
+
+    placement = [None] * len(orgs)
+    for depth, org_index in enumerate(order):
+        placement[org_index] = choice[depth]
+    return placement
+
+
+###################
+## Min-Cost Flow ##
+###################
+
+
+# edges are stored in pairs, so the reverse of edge `e` is `e ^ 1`
+def new_flow_graph(node_count):
+    return {
+        "to": [],
+        "cap": [],
+        "cost": [],
+        "adj": [[] for _ in range(node_count)]
+    }
+
+
+def add_flow_edge(graph, tail, head, cap, cost):
+    edge = len(graph["to"])
+    graph["to"] += [head, tail]
+    graph["cap"] += [cap, 0]
+    graph["cost"] += [cost, -cost]
+    graph["adj"][tail].append(edge)
+    graph["adj"][head].append(edge + 1)
+    return edge
+
+
+# shortest reduced-cost distances from the source over the residual graph,
+#   or None if we ran out of time
+def flow_distances(graph, potential, source, deadline):
+    to, cap, cost, adj = graph["to"], graph["cap"], graph["cost"], graph["adj"]
+
+    dist = [infinity] * len(adj)
+    dist[source] = 0
+    heap = [(0, source)]
+    steps = 0
+    while heap:
+        steps += 1
+        if steps % deadline_check_interval == 0 and \
+           time.monotonic() > deadline:
+            return None
+
+        d, node = heapq.heappop(heap)
+        if d > dist[node]:
+            continue
+        for edge in adj[node]:
+            if cap[edge] > 0:
+                head = to[edge]
+                nd = d + cost[edge] + potential[node] - potential[head]
+                if nd < dist[head]:
+                    dist[head] = nd
+                    heapq.heappush(heap, (nd, head))
+    return dist
+
+
+# push as much flow as possible (up to `limit`) along shortest paths, i.e.
+#   edges with zero reduced cost, Dinic style; returns None if we ran out of
+#   time
+def shortest_path_flow(graph, potential, source, sink, limit, deadline):
+    to, cap, cost, adj = graph["to"], graph["cap"], graph["cost"], graph["adj"]
+
+    def admissible(node, edge):
+        head = to[edge]
+        return cap[edge] > 0 and \
+            cost[edge] + potential[node] - potential[head] == 0
+
+    total = 0
+    steps = 0
+    while total < limit:
+        level = [-1] * len(adj)
+        level[source] = 0
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            for edge in adj[node]:
+                if level[to[edge]] < 0 and admissible(node, edge):
+                    level[to[edge]] = level[node] + 1
+                    queue.append(to[edge])
+        if level[sink] < 0:
+            break
+
+        current = [0] * len(adj)
+        pushed = 0
+        path = []
+        node = source
+        while total + pushed < limit:
+            steps += 1
+            if steps % deadline_check_interval == 0 and \
+               time.monotonic() > deadline:
+                return None
+
+            if node == sink:
+                amount = min(limit - total - pushed,
+                             min(cap[edge] for edge in path))
+                for edge in path:
+                    cap[edge] -= amount
+                    cap[edge ^ 1] += amount
+                pushed += amount
+                path = []
+                node = source
+                continue
+
+            edges = adj[node]
+            while current[node] < len(edges):
+                edge = edges[current[node]]
+                if level[to[edge]] == level[node] + 1 and \
+                   admissible(node, edge):
+                    break
+                current[node] += 1
+            else:
+                # dead end: retreat
+                if node == source:
+                    break
+                level[node] = -1
+                edge = path.pop()
+                node = to[edge ^ 1]
+                current[node] += 1
+                continue
+
+            path.append(edge)
+            node = to[edge]
+
+        if not pushed:
+            break
+        total += pushed
+    return total
+
+
+# returns the amount of flow sent (at most `needed`) at minimum cost, or
+#   None if we ran out of time
+def min_cost_flow(graph, source, sink, needed, deadline):
+    potential = [0] * len(graph["adj"])
+    flow = 0
+    while flow < needed:
+        if time.monotonic() > deadline:
+            return None
+
+        dist = flow_distances(graph, potential, source, deadline)
+        if dist is None:
+            return None
+        if dist[sink] == infinity:
+            break
+        for node in range(len(potential)):
+            if dist[node] < infinity:
+                potential[node] += dist[node]
+
+        pushed = shortest_path_flow(graph, potential, source, sink,
+                                    needed - flow, deadline)
+        if pushed is None:
+            return None
+        if not pushed:
+            break
+        flow += pushed
+    return flow
+
+
+#################
+## Team Rounds ##
+#################
+
+
+# the open rooms offered to an organization: those in its individual
+#   building, then the next `count` of `by_free` (the other open rooms,
+#   most free seats first) from `start` on, wrapping around
+def offered_rooms(org, building_rooms, by_free, count, start):
+    home_rooms = building_rooms.get(org.indroom.buildingid, [])
+    offered = [x for x in home_rooms if x not in org.teamroomset]
+    for step in range(min(count, len(by_free))):
+        room_index = by_free[(start + step) % len(by_free)]
+        if room_index not in org.teamroomset and \
+           room_index not in home_rooms:
+            offered.append(room_index)
+    return offered
+
+
+# place every team that does not yet have a team room; power teams go
+#   first so that each room takes at most one of them; returns False if
+#   there is no way to place them or we ran out of time
+def assign_team_rooms_flow(organizations, rooms, buildings, deadline):
+    for power_pass in (True, False):
+        pending = []
+        for org in organizations:
+            teams = [x for x in org.teams if x.teamroom is None and
+                     (x.powerindex is not None) == power_pass]
+            if teams:
+                pending.append((org, teams))
+        if not pending:
+            continue
+
+        open_rooms = [x.id for x in rooms
+                      if x.teamcap > x.teamassigned and
+                      (not power_pass or x.powerteams == 0)]
+
+        # nodes: source, sink, then organizations, then rooms
+        source, sink = 0, 1
+        graph = new_flow_graph(2 + len(pending) + len(open_rooms))
+        room_nodes = {}
+        for position, room_index in enumerate(open_rooms):
+            room = rooms[room_index]
+            room_nodes[room_index] = 2 + len(pending) + position
+            add_flow_edge(graph, room_nodes[room_index], sink,
+                          1 if power_pass else
+                          room.teamcap - room.teamassigned, 0)
+
+        building_rooms = {}
+        for room_index in open_rooms:
+            building_rooms.setdefault(rooms[room_index].buildingid,
+                                      []).append(room_index)
+        by_free = sorted(open_rooms, key=lambda x:
+                         rooms[x].teamassigned - rooms[x].teamcap)
+
+        org_edges = []
+        needed = 0
+        start = 0
+        for position, (org, teams) in enumerate(pending):
+            if position % deadline_check_interval == 0 and \
+               time.monotonic() > deadline:
+                return False
+
+            org_node = 2 + position
+            add_flow_edge(graph, source, org_node, len(teams), 0)
+            needed += len(teams)
+
+            count = max(flow_room_choices, len(teams))
+            edges = []
+            for room_index in offered_rooms(org, building_rooms, by_free,
+                                            count, start):
+                cost = 0 if rooms[room_index].buildingid == \
+                    org.indroom.buildingid else 1
+                edges.append((add_flow_edge(graph, org_node,
+                                            room_nodes[room_index], 1, cost),
+                              room_index))
+            org_edges.append(edges)
+            start += count
+
+        flow = min_cost_flow(graph, source, sink, needed, deadline)
+        if flow is None or flow < needed:
+            return False
+
+        for (org, teams), edges in zip(pending, org_edges):
+            used = [x for edge, x in edges if graph["cap"][edge] == 0]
+            for team, room_index in zip(teams, used):
+                room = rooms[room_index]
+                assign_team_room(team, org, room, buildings[room.buildingid])
+
+    return True
+
+
+########################
+## Awards, Guts Rooms ##
+########################
+
+
+# if possible, pack the awards rooms so that every organization also fits in
+#   its awards room for guts
+def assign_awards_rooms_flow(organizations, rooms, deadline):
+    awards_rooms = [x for x in rooms if x.awardscap > 0]
+    placement = pack_organizations(
+        organizations,
+        [min(x.awardscap - x.awardsassigned, x.gutscap - x.gutsassigned)
+         for x in awards_rooms],
+        deadline)
+    if placement is None:
+        placement = pack_organizations(
+            organizations,
+            [x.awardscap - x.awardsassigned for x in awards_rooms],
+            deadline)
+    if placement is None:
+        return False
+
+    for org, room_index in zip(organizations, placement):
+        room = awards_rooms[room_index]
+        org.awardsroom = room
+        room.awardsassigned += org.number_of_teams
+    return True
+
+
+# organizations stay in their awards room for guts whenever it fits; the
+#   rest are packed into the remaining guts capacity
+def assign_guts_rooms_flow(organizations, rooms, deadline):
+    guts_rooms = [x for x in rooms if x.gutscap > 0]
+
+    def place(org, room):
+        org.gutsroom = room
+        room.gutsassigned += org.number_of_teams
+
+    rest = []
+    for org in organizations:
+        room = org.awardsroom
+        if room.gutscap - room.gutsassigned >= org.number_of_teams:
+            place(org, room)
+        else:
+            rest.append(org)
+
+    placement = pack_organizations(
+        rest, [x.gutscap - x.gutsassigned for x in guts_rooms],
+        deadline)
+    if placement is None:
+        # staying in the awards room can use up space the others need, so
+        #   try again without that preference
+        for room in guts_rooms:
+            room.gutsassigned = 0
+        rest = organizations
+        placement = pack_organizations(
+            rest, [x.gutscap for x in guts_rooms], deadline)
+        if placement is None:
+            return False
+
+    for org, room_index in zip(rest, placement):
+        place(org, guts_rooms[room_index])
+    return True
+
+
+#################
+## Flow Engine ##
+#################
+
+
+# expects the individuals organization to already be placed (see
+#   `assign_individuals_room`); returns the organizations in the same order
+#   as `assign_greedy`, or None if the greedy passes should be used instead
+def assign_flow(organizations, rooms, buildings, budget):
+    deadline = time.monotonic() + budget
+
+    others = organizations[1:]
+    placement = pack_organizations(
+        others, [x.indcap - x.indassigned for x in rooms], deadline)
+    if placement is None:
+        return None
+
+    for org, room_index in zip(others, placement):
+        room = rooms[room_index]
+        room.indassigned += org.number_of_teams
+        buildings[room.buildingid].indassigned += org.number_of_teams
+        org.indroom = room
+
+    if not assign_team_rooms_flow(others, rooms, buildings, deadline):
+        return None
+
+    organizations = sorted(organizations, key=awards_key)
+    if not assign_awards_rooms_flow(organizations, rooms, deadline) or \
+       not assign_guts_rooms_flow(organizations, rooms, deadline):
+        return None
+
+    return organizations
@@ -0,0 +1,375 @@
+###########################
+# Some High Level Details #
+###########################
+
+
+# An optional pass that improves a finished assignment, selected with
+# `-l LOCAL_SEARCH_BUDGET`. It runs a local search that only ever keeps
+# changes that do not make the assignment worse, where the score to minimize
+# is the number of teams outside their organization's individual building
+# plus the number of organizations whose guts room is not their awards room.
+
+# The changes it tries are:
+
+# - moving a team to another team room, or swapping it with a team of
+#   another organization when that room is full;
+# - moving an organization's guts round into its awards room, or its awards
+#   ceremony into its guts room, swapping guts rooms with another
+#   organization when there is no space.
+
+# Every change is scored by the difference it makes to the teams and
+# organizations it touches, so a step costs O(1) no matter how large the
+# tournament is. Room capacities, "one team per organization per team room"
+# and "at most one power team per room" are checked before every change,
+# so they hold throughout.
+
+# The search is restarted with RESTARTS different seeds on a process pool,
+# and the best result wins. The restarts share one deadline, set when the
+# pass starts, so the pass takes about LOCAL_SEARCH_BUDGET seconds however
+# many restarts there are; restarts that only get a worker after the
+# deadline stop right away. With a single worker (e.g. inside a sweep or
+# batch job), the restarts run one after the other, each with an equal
+# share of the budget. The individuals organization (wherever it is in
+# the list) is never touched, so its teams stay in INDIV_ROOM.
+
+
+###########
+# Imports #
+###########
+
+
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from assign_rooms import assign_team_room, individual_org_name
+
+
+###########
+# Globals #
+###########
+
+
+# how many search steps to take between checks of the clock
+deadline_check_interval = 1024
+
+# a restart stops after this many steps even if there is time left, which
+#   keeps small tournaments (and runs on fast machines) reproducible
+local_search_steps = 1000000
+
+# the share of steps that try to move organizations instead of teams
+org_move_share = 0.2
+
+# the share of team moves that only look at rooms in the organization's
+#   individual building
+home_move_share = 0.5
+
+
+###########
+## State ##
+###########
+
+
+# the organizations the search may change, in the order they are given;
+#   after the awards pass the individuals organization is no longer first
+def search_orgs(organizations):
+    return [x for x in organizations if x.orgname != individual_org_name]
+
+
+# a compact, picklable copy of everything the search needs; rooms are
+#   referred to by id, and organizations and teams by their position in
+#   `orgs` and `teams`
+def search_state(organizations, rooms, buildings):
+    orgs = search_orgs(organizations)
+    teams = [team for org in orgs for team in org.teams]
+    org_positions = {org.orgid: position for position, org in enumerate(orgs)}
+
+    def room_id(room):
+        return room.id if room else None
+
+    return {
+        "room_building": [x.buildingid for x in rooms],
+        "teamcap": [x.teamcap for x in rooms],
+        "teamload": [x.teamassigned for x in rooms],
+        "powerteams": [x.powerteams for x in rooms],
+        "gutscap": [x.gutscap for x in rooms],
+        "gutsload": [x.gutsassigned for x in rooms],
+        "awardscap": [x.awardscap for x in rooms],
+        "awardsload": [x.awardsassigned for x in rooms],
+        "team_rooms": [x.id for x in rooms if x.teamcap > 0],
+        "building_rooms": [[x.id for x in building.rooms if x.teamcap > 0]
+                           for building in buildings],
+        "org_size": [x.number_of_teams for x in orgs],
+        "org_building": [x.indroom.buildingid for x in orgs],
+        "org_guts": [room_id(x.gutsroom) for x in orgs],
+        "org_awards": [room_id(x.awardsroom) for x in orgs],
+        "team_org": [org_positions[x.orgid] for x in teams],
+        "team_power": [x.powerindex is not None for x in teams],
+        "team_room": [x.teamroom.id for x in teams]
+    }
+
+
+def search_score(state):
+    room_building = state["room_building"]
+    org_building = state["org_building"]
+
+    scattered = 0
+    for team, room in enumerate(state["team_room"]):
+        if room_building[room] != org_building[state["team_org"][team]]:
+            scattered += 1
+
+    split = 0
+    for guts, awards in zip(state["org_guts"], state["org_awards"]):
+        if guts is not None and awards is not None and guts != awards:
+            split += 1
+
+    return scattered + split
+
+
+# rooms keep lists of their teams (or guts organizations), and `slots`
+#   remembers where each item sits, so both adding and removing are O(1)
+def add_to_room(members, slots, room, item):
+    slots[item] = len(members[room])
+    members[room].append(item)
+
+
+def remove_from_room(members, slots, room, item):
+    room_members = members[room]
+    last = room_members.pop()
+    if last != item:
+        room_members[slots[item]] = last
+        slots[last] = slots[item]
+
+
+##################
+## Local Search ##
+##################
+
+
+# `deadline` is a time.monotonic() value, which is the same clock in every
+#   process
+def local_search(state, seed, deadline, steps=local_search_steps):
+    rng = random.Random(seed)
+
+    room_building = state["room_building"]
+    teamcap, gutscap, awardscap = state["teamcap"], state["gutscap"], \
+        state["awardscap"]
+    team_rooms, building_rooms = state["team_rooms"], state["building_rooms"]
+    org_size, org_building = state["org_size"], state["org_building"]
+    team_org, team_power = state["team_org"], state["team_power"]
+
+    teamload = list(state["teamload"])
+    powerteams = list(state["powerteams"])
+    gutsload = list(state["gutsload"])
+    awardsload = list(state["awardsload"])
+    org_guts = list(state["org_guts"])
+    org_awards = list(state["org_awards"])
+    team_room = list(state["team_room"])
+
+    room_teams = [[] for _ in room_building]
+    team_slots = [0] * len(team_room)
+    org_rooms = [set() for _ in org_size]
+    for team, room in enumerate(team_room):
+        add_to_room(room_teams, team_slots, room, team)
+        org_rooms[team_org[team]].add(room)
+
+    guts_orgs = [[] for _ in room_building]
+    org_slots = [0] * len(org_size)
+    for org, room in enumerate(org_guts):
+        if room is not None:
+            add_to_room(guts_orgs, org_slots, room, org)
+
+    def move_team(team, old, new):
+        org = team_org[team]
+        remove_from_room(room_teams, team_slots, old, team)
+        add_to_room(room_teams, team_slots, new, team)
+        org_rooms[org].discard(old)
+        org_rooms[org].add(new)
+        teamload[old] -= 1
+        teamload[new] += 1
+        if team_power[team]:
+            powerteams[old] -= 1
+            powerteams[new] += 1
+        team_room[team] = new
+
+    def move_guts(org, old, new):
+        remove_from_room(guts_orgs, org_slots, old, org)
+        add_to_room(guts_orgs, org_slots, new, org)
+        gutsload[old] -= org_size[org]
+        gutsload[new] += org_size[org]
+        org_guts[org] = new
+
+    score = search_score(state)
+    if not team_room:
+        return {"seed": seed, "score": score, "steps": 0,
+                "team_room": team_room, "org_guts": org_guts,
+                "org_awards": org_awards}
+
+    step = 0
+    while step < steps:
+        if step % deadline_check_interval == 0 and \
+           time.monotonic() > deadline:
+            break
+        step += 1
+
+        if rng.random() < org_move_share:
+            org = rng.randrange(len(org_size))
+            guts, awards = org_guts[org], org_awards[org]
+            if guts is None or awards is None or guts == awards:
+                continue
+            size = org_size[org]
+
+            if rng.random() < 0.5:
+                # bring the guts round into the awards room
+                if gutscap[awards] - gutsload[awards] >= size:
+                    move_guts(org, guts, awards)
+                    score -= 1
+                    continue
+
+                # trade guts rooms with an organization that does not have
+                #   its awards ceremony there anyway
+                if not guts_orgs[awards]:
+                    continue
+                other = rng.choice(guts_orgs[awards])
+                other_size = org_size[other]
+                if org_awards[other] == awards or \
+                   gutsload[awards] - other_size + size > gutscap[awards] or \
+                   gutsload[guts] - size + other_size > gutscap[guts]:
+                    continue
+                move_guts(org, guts, awards)
+                move_guts(other, awards, guts)
+                score -= 1 + (org_awards[other] == guts)
+            elif awardscap[guts] - awardsload[guts] >= size:
+                # bring the awards ceremony into the guts room
+                awardsload[awards] -= size
+                awardsload[guts] += size
+                org_awards[org] = guts
+                score -= 1
+            continue
+
+        team = rng.randrange(len(team_room))
+        org = team_org[team]
+        old = team_room[team]
+        home = org_building[org]
+        pool = building_rooms[home] if rng.random() < home_move_share \
+            else team_rooms
+        if not pool:
+            continue
+        new = rng.choice(pool)
+        if new in org_rooms[org]:
+            continue
+
+        delta = (room_building[new] != home) - (room_building[old] != home)
+        if delta > 0:
+            continue
+
+        if teamload[new] < teamcap[new]:
+            if team_power[team] and powerteams[new]:
+                continue
+            move_team(team, old, new)
+            score += delta
+            continue
+
+        # the room is full, so swap with one of its teams
+        if not room_teams[new]:
+            continue
+        other = rng.choice(room_teams[new])
+        other_org = team_org[other]
+        if other_org == org or old in org_rooms[other_org]:
+            continue
+        if powerteams[new] - team_power[other] + team_power[team] > 1 or \
+           powerteams[old] - team_power[team] + team_power[other] > 1:
+            continue
+
+        other_home = org_building[other_org]
+        delta += (room_building[old] != other_home) - \
+            (room_building[new] != other_home)
+        if delta > 0:
+            continue
+
+        move_team(team, old, new)
+        move_team(other, new, old)
+        score += delta
+
+    return {"seed": seed, "score": score, "steps": step,
+            "team_room": team_room, "org_guts": org_guts,
+            "org_awards": org_awards}
+
+
+##############
+## Restarts ##
+##############
+
+
+# runs the restarts on at most `workers` processes; with a single one, they
+#   run one after the other, each with its share of the budget
+def run_restarts(state, seed, budget, restarts, workers=None):
+    start = time.monotonic()
+    deadline = start + budget
+    seeds = [seed + x for x in range(restarts)]
+    workers = min(restarts, workers or os.cpu_count() or 1)
+    if workers == 1:
+        return [local_search(state, x, start + budget * (number + 1) /
+                             restarts)
+                for number, x in enumerate(seeds)]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(local_search, state, x, deadline)
+                   for x in seeds]
+        return [x.result() for x in futures]
+
+
+# writes a search result back into the records, keeping the room, building
+#   and organization bookkeeping in sync
+def apply_result(organizations, rooms, buildings, result):
+    orgs = search_orgs(organizations)
+
+    for org in orgs:
+        for team in org.teams:
+            room = team.teamroom
+            room.teamassigned -= 1
+            buildings[room.buildingid].teamassigned -= 1
+            if team.powerindex is not None:
+                room.powerteams -= 1
+            team.teamroom = None
+        org.teamrooms = []
+        org.teamroomset = set()
+        org.unplaced = org.number_of_teams
+
+    team_rooms = iter(result["team_room"])
+    for org in orgs:
+        for team in org.teams:
+            room = rooms[next(team_rooms)]
+            assign_team_room(team, org, room, buildings[room.buildingid])
+
+    for org, guts, awards in zip(orgs, result["org_guts"],
+                                 result["org_awards"]):
+        if guts is not None and org.gutsroom is not rooms[guts]:
+            org.gutsroom.gutsassigned -= org.number_of_teams
+            org.gutsroom = rooms[guts]
+            org.gutsroom.gutsassigned += org.number_of_teams
+        if awards is not None and org.awardsroom is not rooms[awards]:
+            org.awardsroom.awardsassigned -= org.number_of_teams
+            org.awardsroom = rooms[awards]
+            org.awardsroom.awardsassigned += org.number_of_teams
+
+
+# improves a finished assignment in place, running the restarts on at most
+#   `workers` processes; returns the score before and after (see the top of
+#   this file), or None if some team has no team room, so that the usual
+#   error is raised when the rows are built
+def improve_assignment(organizations, rooms, buildings, budget, restarts,
+                       workers=None, seed=0):
+    if any(x.unplaced for x in organizations):
+        return None
+
+    state = search_state(organizations, rooms, buildings)
+    before = search_score(state)
+
+    results = run_restarts(state, seed, budget, restarts, workers)
+    best = min(results, key=lambda x: (x["score"], x["seed"]))
+    if best["score"] < before:
+        apply_result(organizations, rooms, buildings, best)
+        return before, best["score"]
+    return before, before
@@ -0,0 +1,282 @@
+###########################
+# Some High Level Details #
+###########################
+
+
+# The partition engine (`-e partition`) splits a large tournament into
+# WORKERS independent clusters and runs the individual and team passes of
+# the greedy engine on each cluster in its own process.
+
+# A cluster is a set of buildings, chosen so that every cluster has about
+# the same share of the free individual seats and of the free team seats
+# (buildings with neither are left out, since they only matter for guts and
+# awards); balancing the two separately matters when some buildings only
+# have individual rooms and others only team rooms. A building with more
+# than a cluster's share of either is dealt out room by room, as the
+# clusters could not be balanced otherwise. Organizations are then
+# dealt out in the usual order, each to the cluster that would be least
+# loaded after taking it, counting individual seats, team seats and team
+# rooms for power teams.
+
+# A cluster only takes an organization it can still hold: the individual
+# pass must find it a room (the first fit is worked out here exactly as the
+# pass will do it, since the cluster sees its organizations in the same
+# order), and there must be enough team seats left, enough team rooms for
+# its teams, and a free team room for each of its power teams.
+
+# Every organization then has all its rooms for the individual and team
+# rounds in one cluster, so the clusters never compete for a room. The
+# placements are merged back into the full room list, and the awards and
+# guts rooms, which are shared by everyone, are handed out over all rooms as
+# in the greedy engine.
+
+# Besides running in parallel, this cuts down the work of the passes that
+# search every room for each team, since each cluster only searches its own.
+# On the tournaments `bench_rooms.py` generates, that only pays for the
+# extra processes from about 50000 teams on; below that, use greedy.
+# The individuals room is taken before the clusters are made. If some
+# organization fits in no cluster, e.g. because a single room holds most of
+# the individual seats, the clusters are made again with half as many. If
+# that gets down to one cluster, or some cluster cannot place all of its
+# organizations, everything is assigned by the greedy engine instead, as it
+# is when there is only one worker.
+
+
+###########
+# Imports #
+###########
+
+
+import copy
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import profile_rooms
+from assign_rooms import Organization, assign_greedy, \
+    assign_individual_rooms, assign_org_rooms, assign_team_room, \
+    assign_team_rooms_anywhere, assign_team_rooms_in_building, \
+    build_capacity_index, first_fit, room_list_to_building_object, timed, \
+    update_capacity_index
+
+
+##############
+## Clusters ##
+##############
+
+
+# deals the buildings with free individual or team seats out to `count`
+#   clusters, largest share first, each to the cluster whose larger share
+#   of the individual and the team seats stays smallest, and the rooms of a
+#   building with more than a cluster's share one at a time; returns lists
+#   of rooms, in the order of `rooms`
+def building_clusters(rooms, buildings, count):
+    ind_total = max(sum(x.indcap - x.indassigned for x in buildings), 1)
+    team_total = max(sum(x.teamcap - x.teamassigned for x in buildings), 1)
+
+    def shares(room_or_building):
+        return ((room_or_building.indcap - room_or_building.indassigned) /
+                ind_total,
+                (room_or_building.teamcap - room_or_building.teamassigned) /
+                team_total)
+
+    units = []
+    for building in buildings:
+        if max(shares(building)) > 1 / count:
+            units.extend((shares(x), [x.id]) for x in building.rooms)
+        else:
+            units.append((shares(building), [x.id for x in building.rooms]))
+
+    clusters = [set() for _ in range(count)]
+    loads = [(0, 0)] * count
+    for (ind_share, team_share), room_ids in sorted(
+            units, key=lambda x: -sum(x[0])):
+        if ind_share + team_share == 0:
+            continue
+        cluster = min(range(count),
+                      key=lambda x: (max(loads[x][0] + ind_share,
+                                         loads[x][1] + team_share),
+                                     sum(loads[x])))
+        clusters[cluster].update(room_ids)
+        loads[cluster] = (loads[cluster][0] + ind_share,
+                          loads[cluster][1] + team_share)
+
+    return [[x for x in rooms if x.id in cluster]
+            for cluster in clusters if cluster]
+
+
+# `ind_index` holds the free individual seats of the cluster's rooms, as
+#   the individual pass will index them
+def cluster_stats(cluster_rooms):
+    team_rooms = sum(1 for x in cluster_rooms
+                     if x.teamcap > x.teamassigned)
+    return {
+        "ind_free": sum(x.indcap - x.indassigned for x in cluster_rooms),
+        "ind_index": build_capacity_index(
+            [x.indcap - x.indassigned for x in cluster_rooms]),
+        "team_free": sum(x.teamcap - x.teamassigned for x in cluster_rooms),
+        "team_rooms": team_rooms,
+        "ind_demand": 0,
+        "team_demand": 0,
+        "power_demand": 0
+    }
+
+
+def cluster_load(stats, size, power_teams):
+    return max((stats["ind_demand"] + size) / max(stats["ind_free"], 1),
+               (stats["team_demand"] + size) / max(stats["team_free"], 1),
+               (stats["power_demand"] + power_teams) /
+               max(stats["team_rooms"], 1))
+
+
+# whether the cluster can still hold an organization of `size` teams with
+#   `power_teams` power teams; returns the position of the room the
+#   individual pass would give it, or None
+def cluster_fit(stats, size, power_teams):
+    if stats["team_demand"] + size > stats["team_free"] or \
+       size > stats["team_rooms"] or \
+       stats["power_demand"] + power_teams > stats["team_rooms"]:
+        return None
+    return first_fit(stats["ind_index"], size)
+
+
+# returns the clusters as dicts of organizations (headed by a stand-in for
+#   the individuals, whom the passes skip) and rooms, or None if some
+#   organization fits in no cluster
+def partition_problem(organizations, rooms, buildings, workers):
+    cluster_rooms = building_clusters(rooms, buildings, workers)
+    stats = [cluster_stats(x) for x in cluster_rooms]
+
+    indiv_org = organizations[0]
+    cluster_orgs = [[Organization(indiv_org.orgid, indiv_org.orgname, [],
+                                  indiv_org.powerindex)]
+                    for _ in cluster_rooms]
+    for org in organizations[1:]:
+        size = org.number_of_teams
+        power_teams = sum(1 for x in org.teams if x.powerindex is not None)
+
+        best = best_room = best_load = None
+        for cluster, cluster_stat in enumerate(stats):
+            room = cluster_fit(cluster_stat, size, power_teams)
+            if room is None:
+                continue
+            load = cluster_load(cluster_stat, size, power_teams)
+            if best is None or load < best_load:
+                best, best_room, best_load = cluster, room, load
+        if best is None:
+            return None
+
+        ind_index = stats[best]["ind_index"]
+        update_capacity_index(
+            ind_index, best_room,
+            ind_index["tree"][ind_index["size"] + best_room] - size)
+        cluster_orgs[best].append(org)
+        stats[best]["ind_demand"] += size
+        stats[best]["team_demand"] += size
+        stats[best]["power_demand"] += power_teams
+
+    return [{"organizations": x, "rooms": y}
+            for x, y in zip(cluster_orgs, cluster_rooms)]
+
+
+#############
+## Solving ##
+#############
+
+
+# runs in a worker on its own copy of the cluster; returns, for every
+#   organization but the stand-in, the position in the cluster's rooms of
+#   its individual room and of each of its teams' rooms, or None if some
+#   team could not be placed
+def solve_cluster(cluster):
+    organizations = cluster["organizations"]
+    rooms = cluster["rooms"]
+    buildings = room_list_to_building_object(rooms)
+
+    try:
+        assign_individual_rooms(organizations, rooms, buildings)
+        for power_only in [True, False]:
+            assign_team_rooms_in_building(organizations, buildings,
+                                          power_only)
+            assign_team_rooms_anywhere(organizations, rooms, buildings,
+                                       power_only)
+    except RuntimeError:
+        return None
+    if any(x.unplaced for x in organizations[1:]):
+        return None
+
+    return [(org.indroom.id, [x.teamroom.id for x in org.teams])
+            for org in organizations[1:]]
+
+
+# runs `solve_cluster` in a worker, collecting the pass counters there when
+#   the run is being profiled, since the worker's counters are its own
+def solve_cluster_counted(cluster, profile):
+    profile_rooms.counters = {} if profile else None
+    return solve_cluster(cluster), profile_rooms.counters
+
+
+def solve_clusters(clusters, workers):
+    if len(clusters) == 1:
+        return [solve_cluster(copy.deepcopy(clusters[0]))]
+
+    profile = profile_rooms.counters is not None
+    with ProcessPoolExecutor(max_workers=min(workers,
+                                             len(clusters))) as executor:
+        results = list(executor.map(solve_cluster_counted, clusters,
+                                    repeat(profile)))
+
+    for _, worker_counters in results:
+        if worker_counters:
+            profile_rooms.add_counters(worker_counters)
+    return [x for x, _ in results]
+
+
+# writes the placements of every cluster back into the full records
+def merge_clusters(clusters, placements, buildings):
+    for cluster, cluster_placements in zip(clusters, placements):
+        rooms = cluster["rooms"]
+        for org, (indroom, teamrooms) in zip(cluster["organizations"][1:],
+                                             cluster_placements):
+            room = rooms[indroom]
+            room.indassigned += org.number_of_teams
+            buildings[room.buildingid].indassigned += org.number_of_teams
+            org.indroom = room
+
+            for team, teamroom in zip(org.teams, teamrooms):
+                room = rooms[teamroom]
+                assign_team_room(team, org, room, buildings[room.buildingid])
+
+
+############
+## Engine ##
+############
+
+
+# expects the individuals room to be taken already; returns the
+#   organizations in output order, like `assign_greedy`
+def assign_partitioned(organizations, rooms, buildings, workers,
+                       timings=None, awards_policy="spread"):
+    if workers < 2:
+        return assign_greedy(organizations, rooms, buildings, timings,
+                             awards_policy)
+
+    clusters = None
+    count = workers
+    while clusters is None and count >= 2:
+        clusters = timed(timings, "partition", partition_problem,
+                         organizations, rooms, buildings, count)
+        count //= 2
+
+    placements = None
+    if clusters is not None:
+        placements = timed(timings, "clusters", solve_clusters, clusters,
+                           workers)
+
+    if placements is None or None in placements:
+        print("The partition engine could not place every organization " +
+              "within its cluster; falling back to the greedy passes.")
+        return assign_greedy(organizations, rooms, buildings, timings,
+                             awards_policy)
+
+    timed(timings, "merge", merge_clusters, clusters, placements, buildings)
+    return assign_org_rooms(organizations, rooms, timings, awards_policy)
@@ -0,0 +1,325 @@
+###########################
+# Some High Level Details #
+###########################
+
+
+# Finds a small set of rooms, out of the candidates in ROOM_CSV, that still
+# seats a projected tournament, so that we stop over-booking. The projected
+# tournament has TEAMS teams with the same organization sizes and share of
+# power teams as the current registrations (it is generated as in
+# `bench_rooms.py`); without -n, the current registrations are used as
+# they are.
+
+# A set of rooms is good enough if the assignment engine assigns every team
+# in it and the result passes every check of `validate_rooms.py` (the
+# engine can leave an organization without a guts room without failing).
+# Most sets are ruled out by the quick check in
+# `feasibility_rooms.py`, which `compute_assignments` runs first, so only
+# promising sets pay for a full assignment. The search:
+
+# - ranks the rooms by how much of each round's demand they seat;
+# - binary searches for a short prefix of that ranking that is good
+#   enough;
+# - then tries to drop each room of that prefix, least valuable first,
+#   keeping every drop that leaves the set good enough.
+
+# The binary search is a heuristic. The greedy engine can fail on a set of
+# rooms and succeed on a smaller one (an extra room can draw an
+# organization away from the building where its teams fit), so it may
+# settle on a longer prefix than needed. The drop pass starts with the
+# shorter prefixes just below the one found, and every set it returns has
+# been assigned in full, so the result is always good enough, if not the
+# smallest possible.
+
+# The individuals room is always kept. The rooms found are written to
+# `planned_rooms.csv` in the work directory, in the format of ROOM_CSV, and
+# the headroom left in every round is printed.
+
+
+#########################
+# Argument Requirements #
+#########################
+
+
+# TEAMS: the projected number of teams; the current number by default.
+
+# SEED: the seed for generating the projected tournament.
+
+# Everything else is as in `assign_rooms.py`; ROOM_CSV holds the candidate
+# rooms.
+
+
+###########
+# Imports #
+###########
+
+
+import csv
+import os
+import random
+import sys
+from collections import Counter
+
+import assign_rooms
+from assign_rooms import Team, awards_policies, cache_modes, \
+    compute_assignments, engines, get_awards_policy, get_cache, get_engine, \
+    get_indiv_team_room, get_input_file, get_month, individual_org_name, \
+    room_assignment_headers, user_info
+from bench_rooms import generate_tournament
+from cache_rooms import load_input, open_cache
+from validate_rooms import validate_assignments
+
+
+###########
+# Globals #
+###########
+
+
+plan_default = {
+    "teams": None,
+    "seed": "2016"
+}
+
+plan_passed_in = {
+    "teams": None,
+    "seed": None
+}
+
+plan_headers = ["building", "number", "indcap", "teamcap", "gutscap",
+                "awardscap"]
+
+# the rounds, with the room field holding each round's capacity
+plan_rounds = [("individual", "indcap"), ("team", "teamcap"),
+               ("guts", "gutscap"), ("awards", "awardscap")]
+
+
+#####################
+## Check Arguments ##
+#####################
+
+
+def print_help():
+    print("\nUsage: [ARGUMENTS]")
+
+    print("\nArgument Options:")
+    print("  -t TEAM_CSV                  File containing team info.")
+    print("  -r ROOM_CSV                  File containing candidate rooms.")
+    print("  -o ORGANIZATION_CSV          File containing organization info.")
+    print("  -p POWERINDEX_CSV            File containing power indices.")
+    print("  -m MONTH                     The month of the tournament.")
+    print("  -i INDIV_ROOM                Where individuals will compete.")
+    print("  -e ENGINE                    Either greedy, flow or partition.")
+    print("  -c CACHE                     Either on, off or clear.")
+    print("  -A AWARDS_POLICY             Either spread or bestfit.")
+    print("  -n TEAMS                     Projected number of teams.")
+    print("  -s SEED                      Seed for the projection.")
+
+    print("\nThe argument requirements can be found ")
+    print("at the top of `plan_rooms.py`.\n")
+    sys.exit()
+
+
+def parse_arguments():
+    if len(sys.argv) == 2 and sys.argv[1] == "-h":
+        print_help()
+
+    if len(sys.argv) % 2 == 0:
+        raise RuntimeError("Every argument must be preceded by a flag. " +
+                           "Use the -h flag to see all arguments/flags.")
+
+    file_flags = {"-t": "teams", "-r": "rooms", "-o": "orgs",
+                  "-p": "powerindices"}
+    value_flags = {"-m": "month", "-i": "indiv_room", "-e": "engine",
+                   "-c": "cache", "-A": "awards_policy"}
+    plan_flags = {"-n": "teams", "-s": "seed"}
+
+    for index in range(len(sys.argv))[1::2]:
+        flag, value = sys.argv[index], sys.argv[index + 1]
+        if flag in file_flags:
+            if not os.path.isfile(value):
+                raise ValueError("The file " + value +
+                                 " passed in is not valid.")
+            assign_rooms.passed_in[file_flags[flag]] = value
+        elif flag in value_flags:
+            if flag == "-e" and value not in engines:
+                raise ValueError("The engine must be one of " +
+                                 ", ".join(engines) + ".")
+            if flag == "-c" and value not in cache_modes:
+                raise ValueError("The cache must be one of " +
+                                 ", ".join(cache_modes) + ".")
+            if flag == "-A" and value not in awards_policies:
+                raise ValueError("The awards policy must be one of " +
+                                 ", ".join(awards_policies) + ".")
+            assign_rooms.passed_in[value_flags[flag]] = value
+        elif flag in plan_flags:
+            plan_passed_in[plan_flags[flag]] = value
+        else:
+            raise RuntimeError("You used an invalid flag. " +
+                               "Use the -h flag to see all arguments/flags.")
+
+
+def get_plan_option(option):
+    if plan_passed_in[option] is not None:
+        return plan_passed_in[option]
+    return plan_default[option]
+
+
+################
+## Projection ##
+################
+
+
+# a tournament of `team_count` teams with the organization sizes and share
+#   of power teams of the current one, in parsed form
+def projected_inputs(inputs, team_count, seed):
+    indiv_orgids = {x for x, name in inputs["orgs"].items()
+                    if name == individual_org_name}
+    org_sizes = Counter(x.orgid for x in inputs["teams"]
+                        if x.orgid not in indiv_orgids)
+    size_counts = Counter(org_sizes.values())
+    if not size_counts:
+        raise ValueError("There are no registered teams outside of the " +
+                         "individuals to base the projection on.")
+    weights = [size_counts[x] for x in range(1, max(size_counts) + 1)]
+    power_teams = sum(len(x["teamids"])
+                      for x in inputs["powerindices"].values()
+                      if x["index"] < 100)
+
+    rng = random.Random(str(seed) + "^" + str(team_count))
+    tournament = generate_tournament(team_count, weights,
+                                     power_teams / len(inputs["teams"]), 0,
+                                     rng)
+    return {
+        "teams": [Team(*x) for x in tournament["teams"]],
+        "orgs": dict(tournament["orgs"]),
+        "powerindices": {
+            orgid: {"index": index,
+                    "teamids": [int(x) for x in teamids.split("^")]}
+            for orgid, index, teamids in tournament["powerindices"]
+        }
+    }
+
+
+############
+## Search ##
+############
+
+
+# the rows as `validate_assignments` takes them, i.e. as they are read back
+#   from `room_assignments.csv`, where a missing room is empty
+def row_dicts(rows):
+    return [dict(zip(room_assignment_headers,
+                     ["" if x is None else str(x) for x in row]))
+            for row in rows]
+
+
+def seats_everyone(inputs, rooms, options):
+    try:
+        assignments = compute_assignments(
+            inputs["teams"], inputs["orgs"], inputs["powerindices"], rooms,
+            options["month"], options["indiv_room"],
+            engine=options["engine"], awards_policy=options["awards_policy"])
+    except (RuntimeError, ValueError):
+        return False
+    return not validate_assignments(
+        row_dicts(assignments["rows"]), inputs["teams"], inputs["orgs"],
+        inputs["powerindices"], rooms, options["indiv_room"])
+
+
+# how much of each round's demand a room seats
+def room_value(room, team_count):
+    return sum(getattr(room, cap) for _, cap in plan_rounds) / team_count
+
+
+def is_indiv_room(room, indiv_room):
+    return room.building + "^" + room.number == indiv_room
+
+
+# returns the rooms found, in the order of `candidates`, or None if even
+#   every candidate together is not good enough
+def plan_rooms(inputs, candidates, options):
+    def good(chosen):
+        return seats_everyone(inputs, [x for x in candidates
+                                       if id(x) in chosen], options)
+
+    team_count = len(inputs["teams"])
+    pinned = [x for x in candidates
+              if is_indiv_room(x, options["indiv_room"])]
+    ranked = sorted([x for x in candidates if x not in pinned],
+                    key=lambda x: -room_value(x, team_count))
+
+    def prefix(length):
+        return {id(x) for x in pinned + ranked[:length]}
+
+    if not good(prefix(len(ranked))):
+        return None
+
+    low, high = 0, len(ranked)
+    while low < high:
+        middle = (low + high) // 2
+        if good(prefix(middle)):
+            high = middle
+        else:
+            low = middle + 1
+
+    chosen = prefix(low)
+    for room in reversed(ranked[:low]):
+        chosen.remove(id(room))
+        if not good(chosen):
+            chosen.add(id(room))
+
+    return [x for x in candidates if id(x) in chosen]
+
+
+def headroom(inputs, rooms):
+    team_count = len(inputs["teams"])
+    lines = []
+    for round, cap in plan_rounds:
+        seats = sum(getattr(x, cap) for x in rooms)
+        lines.append(round + ": " + str(seats) + " seats for " +
+                     str(team_count) + " teams, " +
+                     str(seats - team_count) + " to spare (" +
+                     "%.1f" % (100 * (seats - team_count) / team_count) +
+                     "%).")
+    return lines
+
+
+def write_plan(rooms, work_dir):
+    with open(work_dir + "/planned_rooms.csv", "w") as file:
+        writer = csv.writer(file)
+        writer.writerow(plan_headers)
+        for room in rooms:
+            writer.writerow([getattr(room, x) for x in plan_headers])
+
+
+########
+# Main #
+########
+
+
+if __name__ == '__main__':
+    parse_arguments()
+
+    cache_dir = open_cache(get_cache(), user_info.work_dir)
+    inputs = {x: load_input(x, get_input_file(x), cache_dir)
+              for x in ["teams", "orgs", "powerindices", "rooms"]}
+    if get_plan_option("teams") is not None:
+        inputs.update(projected_inputs(inputs, int(get_plan_option("teams")),
+                                       get_plan_option("seed")))
+
+    options = {
+        "month": get_month(),
+        "indiv_room": get_indiv_team_room(),
+        "engine": get_engine(),
+        "awards_policy": get_awards_policy()
+    }
+    rooms = plan_rooms(inputs, inputs["rooms"], options)
+    if rooms is None:
+        raise RuntimeError("Even all " + str(len(inputs["rooms"])) +
+                           " candidate rooms cannot seat the tournament.")
+
+    write_plan(rooms, user_info.work_dir)
+    print("Kept " + str(len(rooms)) + " of " + str(len(inputs["rooms"])) +
+          " rooms:")
+    for line in headroom(inputs, rooms):
+        print("  " + line)
@@ -0,0 +1,127 @@
+###########################
+# Some High Level Details #
+###########################
+
+
+# The report written by `assign_rooms.py -P on` (or `--profile on`), as
+# `room_assignments_profile.json` next to `room_assignments.csv`. It holds:
+
+# - timings: the seconds spent in every phase, in the order they ran, from
+#   loading the inputs through the individual, team, awards and guts passes
+#   to writing the output;
+# - counters: for each greedy pass, the rooms it probed, the power checks it
+#   made and the rooms it turned down for lack of capacity;
+# - status: "ok", or the error that stopped the run, with the phase it
+#   happened in as failed_phase.
+
+# With `-P cprofile`, the run is also traced with cProfile: the functions
+# with the most cumulative time are listed in the report, and the full
+# statistics are dumped to `room_assignments_profile.prof` for pstats or any
+# other viewer.
+
+
+###########
+# Imports #
+###########
+
+
+import json
+import os
+import pstats
+
+
+###########
+# Globals #
+###########
+
+
+profile_report_name = "room_assignments_profile.json"
+
+cprofile_stats_name = "room_assignments_profile.prof"
+
+# how many functions to list in the report
+cprofile_limit = 25
+
+# work done by each greedy pass, keyed by pass; only collected when this is
+#   a dict (see `count_work`); it lives here rather than in `assign_rooms.py`
+#   so that a run of that script, which is `__main__`, shares it with the
+#   modules that import the passes from `assign_rooms`
+counters = None
+
+
+##############
+## Counters ##
+##############
+
+
+# the passes count their work in local variables and hand it over once at
+#   the end, so that nothing is slowed down when we are not profiling
+def count_work(phase, rooms_probed, power_checks, capacity_rejections):
+    if counters is None:
+        return
+
+    work = counters.setdefault(phase, {"rooms_probed": 0, "power_checks": 0,
+                                       "capacity_rejections": 0})
+    work["rooms_probed"] += rooms_probed
+    work["power_checks"] += power_checks
+    work["capacity_rejections"] += capacity_rejections
+
+
+# adds the counters collected in a worker process
+def add_counters(worker_counters):
+    for phase, work in worker_counters.items():
+        count_work(phase, work["rooms_probed"], work["power_checks"],
+                   work["capacity_rejections"])
+
+
+##############
+## cProfile ##
+##############
+
+
+def function_name(function):
+    file_name, line, name = function
+    return os.path.basename(file_name) + ":" + str(line) + "(" + name + ")"
+
+
+def cprofile_summary(profiler, limit=cprofile_limit):
+    stats = pstats.Stats(profiler).stats
+    summary = []
+    for function, (_, calls, total, cumulative, _) in stats.items():
+        summary.append({
+            "function": function_name(function),
+            "calls": calls,
+            "total_seconds": total,
+            "cumulative_seconds": cumulative
+        })
+    summary.sort(key=lambda x: -x["cumulative_seconds"])
+    return summary[:limit]
+
+
+############
+## Report ##
+############
+
+
+def profile_report(run_script, timings, counters, profiler=None, error=None):
+    report = {
+        "run_script": run_script,
+        "status": "ok" if error is None else "failed: " + str(error),
+        "failed_phase": list(timings)[-1] if error and timings else None,
+        "total_seconds": sum(timings.values()),
+        "timings": timings,
+        "counters": counters
+    }
+    if profiler:
+        report["cprofile"] = cprofile_summary(profiler)
+    return report
+
+
+def write_profile_report(work_dir, run_script, timings, counters,
+                         profiler=None, error=None):
+    report = profile_report(run_script, timings, counters, profiler, error)
+    with open(os.path.join(work_dir, profile_report_name), "w") as file:
+        json.dump(report, file, indent=2)
+
+    if profiler:
+        profiler.dump_stats(os.path.join(work_dir, cprofile_stats_name))
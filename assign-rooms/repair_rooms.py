@@ -0,0 +1,238 @@
+###########################
+# Some High Level Details #
+###########################
+
+
+# Repairs a previous `room_assignments.csv` after late registrations and
+# withdrawals, selected with `-a PREVIOUS_ASSIGNMENTS_CSV`. Every team that
+# is still registered keeps its rooms whenever the capacity bookkeeping
+# allows it; only new teams, and organizations whose rooms no longer fit
+# them, are placed again.
+
+# Only the placement is incremental. The records are still built from the
+# full inputs, and every surviving team and organization takes back its
+# previous rooms, which is a dict lookup each, so a repair is linear in the
+# size of the tournament like a full run. What grows with the size of the
+# change alone is the search for rooms, which is the expensive part of the
+# greedy passes.
+
+# The individuals go to INDIV_ROOM when it is passed in; otherwise they
+# stay in their previous team room (see `get_indiv_team_room`).
+
+# Alongside the usual output, `room_assignments_diff.csv` lists every team
+# that was added, removed or moved, with its new row (or old row, if it was
+# removed).
+
+
+###########
+# Imports #
+###########
+
+
+import csv
+
+from assign_rooms import assign_individuals_room, assign_team_room, \
+    assignment_row, awards_key, individual_org_name, power_possible, \
+    room_assignment_headers
+
+
+###########
+# Globals #
+###########
+
+
+# the rounds where an organization sits together in a single room; these
+#   prefixes match the org fields ("indroom"), the room fields ("indcap",
+#   "indassigned") and the output columns ("indbuilding")
+org_rounds = ["ind", "awards", "guts"]
+
+diff_headers = ["change"] + room_assignment_headers
+
+
+####################
+## Previous State ##
+####################
+
+
+# every row of a `room_assignments.csv` as a dict keyed by header
+def read_assignment_rows(assignments_file):
+    with open(assignments_file, "r") as file:
+        rows = list(csv.reader(file))
+
+    # skip the "Run script:" line
+    if rows and rows[0] and rows[0][0] == "Run script:":
+        rows = rows[1:]
+
+    return [dict(zip(rows[0], row)) for row in rows[1:]]
+
+
+def read_assignments(assignments_file):
+    return {int(x["teamid"]): x
+            for x in read_assignment_rows(assignments_file)}
+
+
+# the team room of the individuals in the previous assignments, as an
+#   INDIV_ROOM string, or None if there were no individuals
+def previous_indiv_room(previous):
+    for row in previous.values():
+        if row["orgname"] == individual_org_name:
+            return row["teambuilding"] + "^" + row["teamroom"]
+    return None
+
+
+# the previous file names rooms by building and number
+def room_lookup(rooms):
+    return {(x.building, x.number): x for x in rooms}
+
+
+def previous_room(lookup, row, round):
+    if not row:
+        return None
+    return lookup.get((row[round + "building"], row[round + "room"]))
+
+
+###############
+## Placement ##
+###############
+
+
+def org_room_fits(org, room, round):
+    return getattr(room, round + "cap") - getattr(room, round + "assigned") \
+        >= org.number_of_teams
+
+
+def take_org_room(org, room, round, buildings):
+    setattr(org, round + "room", room)
+    setattr(room, round + "assigned",
+            getattr(room, round + "assigned") + org.number_of_teams)
+    if round == "ind":
+        buildings[room.buildingid].indassigned += org.number_of_teams
+
+
+# same preferences as the greedy passes: first room that fits, except that
+#   guts first tries the organization's awards room
+def place_org_room(org, round, rooms, buildings):
+    if round == "guts" and org_room_fits(org, org.awardsroom, round):
+        take_org_room(org, org.awardsroom, round, buildings)
+        return
+
+    for room in rooms:
+        if org_room_fits(org, room, round):
+            take_org_room(org, room, round, buildings)
+            return
+
+    raise RuntimeError("Not able to assign the organization " +
+                       org.orgname + " to a(n) " + round + " room.")
+
+
+def team_room_fits(team, org, room):
+    return room.teamcap > room.teamassigned and \
+        room.id not in org.teamroomset and power_possible(team, room)
+
+
+# prefer the organization's individual building, like the greedy passes
+def place_team(team, org, rooms, buildings):
+    building = buildings[org.indroom.buildingid]
+    for room in building.rooms:
+        if team_room_fits(team, org, room):
+            assign_team_room(team, org, room, building)
+            return
+
+    for room in rooms:
+        if team_room_fits(team, org, room):
+            assign_team_room(team, org, room, buildings[room.buildingid])
+            return
+
+    raise RuntimeError("Not able to assign the team " + team.teamname +
+                       " to a team room.")
+
+
+############
+## Repair ##
+############
+
+
+# `organizations`, `rooms` and `buildings` are freshly built from the new
+#   inputs; returns the organizations in output order and the diff rows
+def repair_assignments(organizations, rooms, buildings, previous,
+                       indiv_room_string):
+    lookup = room_lookup(rooms)
+
+    current = set()
+    changed_orgids = set()
+    for org in organizations:
+        for team in org.teams:
+            current.add(team.teamid)
+            row = previous.get(team.teamid)
+            if not row or int(row["orgid"]) != org.orgid:
+                changed_orgids.add(org.orgid)
+
+    removed = [previous[x] for x in previous if x not in current]
+    for row in removed:
+        changed_orgids.add(int(row["orgid"]))
+
+    indiv_org = organizations[0]
+    assign_individuals_room(organizations, buildings, indiv_room_string)
+
+    # unchanged organizations claim their previous rooms first
+    ordered = [x for x in organizations if x.orgid not in changed_orgids] + \
+        [x for x in organizations if x.orgid in changed_orgids]
+
+    pending_rounds = {round: [] for round in org_rounds}
+    pending_teams = []
+    for org in ordered:
+        org_rows = [previous[x.teamid] for x in org.teams
+                    if x.teamid in previous]
+        for round in org_rounds:
+            if org is indiv_org and round == "ind":
+                continue
+            room = previous_room(lookup, org_rows[0] if org_rows else None,
+                                 round)
+            if room and org_room_fits(org, room, round):
+                take_org_room(org, room, round, buildings)
+            else:
+                pending_rounds[round].append(org)
+
+        if org is indiv_org:
+            continue
+        for team in org.teams:
+            room = previous_room(lookup, previous.get(team.teamid), "team")
+            if room and team_room_fits(team, org, room):
+                assign_team_room(team, org, room, buildings[room.buildingid])
+            else:
+                pending_teams.append((org, team))
+
+    # place whatever did not survive, in the same order as the greedy passes
+    for org in pending_rounds["ind"]:
+        place_org_room(org, "ind", rooms, buildings)
+
+    pending_teams.sort(key=lambda x: x[1].powerindex is None)
+    for org, team in pending_teams:
+        place_team(team, org, rooms, buildings)
+
+    for round in ["awards", "guts"]:
+        for org in sorted(pending_rounds[round], key=awards_key):
+            place_org_room(org, round, rooms, buildings)
+
+    # only organizations that changed or had something placed again can have
+    #   different rows, along with the individuals, who move when INDIV_ROOM
+    #   names another room
+    touched = {indiv_org.orgid} | changed_orgids | \
+        {x.orgid for round in org_rounds for x in pending_rounds[round]} | \
+        {x.orgid for x, _ in pending_teams}
+
+    diff = [["removed"] + [row[x] for x in room_assignment_headers]
+            for row in removed]
+    for org in organizations:
+        if org.orgid not in touched:
+            continue
+        for team in org.teams:
+            row = assignment_row(team, org)
+            if team.teamid not in previous:
+                diff.append(["added"] + row)
+            elif [str(x) for x in row] != \
+                    [previous[team.teamid][x]
+                     for x in room_assignment_headers]:
+                diff.append(["moved"] + row)
+
+    return sorted(organizations, key=awards_key), diff
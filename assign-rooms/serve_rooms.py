@@ -0,0 +1,430 @@
+###########################
+# Some High Level Details #
+###########################
+
+
+# A small HTTP server around the assignment logic, so that several people
+# can ask for assignments and what-ifs during the event without each of
+# them starting the script (and writing to the same work directory at the
+# same time). It only listens on localhost, and it parses the tournament
+# once at the start and keeps it in memory.
+
+# Requests are handled on their own threads, so they run concurrently. The
+# inputs are never modified by a request, and writing
+# `room_assignments.csv` (or reloading the inputs) happens under a lock,
+# one request at a time.
+
+# Every request and response body is JSON. The endpoints are:
+
+# - GET /status: the input files and when they were loaded;
+# - POST /reload: parse the input files again, e.g. after editing them;
+# - POST /assign: run an assignment; the body may override any of "month",
+#   "indiv_room", "engine", "budget", "awards_policy", "local_search" and
+#   "restarts" (the server's flags are the defaults), and with "write" set
+#   to true the result is also written to `room_assignments.csv`;
+# - POST /repair: like /assign, but repairs the assignments in "previous"
+#   (`room_assignments.csv` in the work directory by default);
+# - POST /validate: check the assignments in "assignments"
+#   (`room_assignments.csv` in the work directory by default) against the
+#   rules, as in `validate_rooms.py`, and, if "indiv_room" is given, that
+#   the individuals are there.
+
+# The numeric options must be finite and at most their limit in
+# `option_limits`, so that no request can hold a thread (and its worker
+# processes) for long. The partition engine and the local search restarts
+# start their worker processes with "spawn" instead of forking, since a
+# fork of this process would copy the other requests' threads mid-flight.
+
+# A response has a "status" of "ok", or "failed" with the "error" and an
+# HTTP status of 400 (the request or one of its options is malformed), 422
+# (the inputs cannot be assigned) or 500 (anything else; the server keeps
+# running).
+
+
+#########################
+# Argument Requirements #
+#########################
+
+
+# PORT: the port to listen on, "8000" by default.
+
+# Everything else is as in `assign_rooms.py`, and sets the defaults for the
+# requests.
+
+
+###########
+# Imports #
+###########
+
+
+import json
+import math
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import assign_rooms
+from assign_rooms import awards_policies, cache_modes, compute_assignments, \
+    engines, get_awards_policy, get_budget, get_cache, get_engine, \
+    get_indiv_team_room, get_input_file, get_local_search, get_month, \
+    get_restarts, room_assignment_headers, user_info, write_assignments
+from cache_rooms import load_input, open_cache
+
+
+###########
+# Globals #
+###########
+
+
+serve_default = {
+    "port": "8000"
+}
+
+serve_passed_in = {
+    "port": None
+}
+
+serve_host = "127.0.0.1"
+
+input_kinds = ["teams", "orgs", "powerindices", "rooms"]
+
+# the options a request may override, with their getters
+request_getters = {
+    "month": get_month,
+    "indiv_room": get_indiv_team_room,
+    "engine": get_engine,
+    "budget": get_budget,
+    "awards_policy": get_awards_policy,
+    "local_search": get_local_search,
+    "restarts": get_restarts
+}
+
+# the options of a request that hold text, and those that hold numbers, with
+#   how to read them
+text_options = ["month", "indiv_room", "engine", "awards_policy"]
+
+number_options = {
+    "budget": float,
+    "local_search": float,
+    "restarts": int
+}
+
+# the largest value a request may ask for, in seconds for the budgets
+option_limits = {
+    "budget": 120,
+    "local_search": 120,
+    "restarts": 64
+}
+
+# what the assignment may raise for inputs that cannot be assigned, e.g. a
+#   team whose organization is missing
+assign_errors = (RuntimeError, ValueError, KeyError, IndexError)
+
+# the parsed tournament, swapped out whole on a reload so that a request
+#   keeps using the inputs it started with
+service = {
+    "inputs": None,
+    "loaded": None,
+    "cache_dir": None,
+    "lock": threading.Lock()
+}
+
+
+#####################
+## Check Arguments ##
+#####################
+
+
+def print_help():
+    print("\nUsage: [ARGUMENTS]")
+
+    print("\nArgument Options:")
+    print("  -t TEAM_CSV                  File containing team info.")
+    print("  -r ROOM_CSV                  File containing room info.")
+    print("  -o ORGANIZATION_CSV          File containing organization info.")
+    print("  -p POWERINDEX_CSV            File containing power indices.")
+    print("  -m MONTH                     The month of the tournament.")
+    print("  -i INDIV_ROOM                Where individuals will compete.")
+    print("  -e ENGINE                    Either greedy, flow or partition.")
+    print("  -b BUDGET                    Seconds the flow engine may take.")
+    print("  -c CACHE                     Either on, off or clear.")
+    print("  -A AWARDS_POLICY             Either spread or bestfit.")
+    print("  -l LOCAL_SEARCH_BUDGET       Seconds to spend improving.")
+    print("  -R RESTARTS                  Number of local searches to run.")
+    print("  -n PORT                      Port to listen on.")
+
+    print("\nThe argument requirements can be found ")
+    print("at the top of `serve_rooms.py`.\n")
+    sys.exit()
+
+
+def parse_arguments():
+    if len(sys.argv) == 2 and sys.argv[1] == "-h":
+        print_help()
+
+    if len(sys.argv) % 2 == 0:
+        raise RuntimeError("Every argument must be preceded by a flag. " +
+                           "Use the -h flag to see all arguments/flags.")
+
+    file_flags = {"-t": "teams", "-r": "rooms", "-o": "orgs",
+                  "-p": "powerindices"}
+    value_flags = {"-m": "month", "-i": "indiv_room", "-e": "engine",
+                   "-b": "budget", "-c": "cache", "-A": "awards_policy",
+                   "-l": "local_search", "-R": "restarts"}
+
+    for index in range(len(sys.argv))[1::2]:
+        flag, value = sys.argv[index], sys.argv[index + 1]
+        if flag in file_flags:
+            if not os.path.isfile(value):
+                raise ValueError("The file " + value +
+                                 " passed in is not valid.")
+            assign_rooms.passed_in[file_flags[flag]] = value
+        elif flag in value_flags:
+            if flag == "-e" and value not in engines:
+                raise ValueError("The engine must be one of " +
+                                 ", ".join(engines) + ".")
+            if flag == "-c" and value not in cache_modes:
+                raise ValueError("The cache must be one of " +
+                                 ", ".join(cache_modes) + ".")
+            if flag == "-A" and value not in awards_policies:
+                raise ValueError("The awards policy must be one of " +
+                                 ", ".join(awards_policies) + ".")
+            assign_rooms.passed_in[value_flags[flag]] = value
+        elif flag == "-n":
+            serve_passed_in["port"] = value
+        else:
+            raise RuntimeError("You used an invalid flag. " +
+                               "Use the -h flag to see all arguments/flags.")
+
+
+def get_port():
+    return int(serve_passed_in["port"] or serve_default["port"])
+
+
+# a request that is malformed, as opposed to one whose inputs cannot be
+#   assigned
+class RequestError(ValueError):
+    pass
+
+
+############
+## Inputs ##
+############
+
+
+def reload_tournament():
+    with service["lock"]:
+        service["inputs"] = {x: load_input(x, get_input_file(x),
+                                           service["cache_dir"])
+                             for x in input_kinds}
+        service["loaded"] = time.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def text_field(body, field):
+    value = body.get(field)
+    if value is not None and not isinstance(value, str):
+        raise RequestError("The field " + field + " must be a string.")
+    return value
+
+
+def assignments_path(body, field):
+    path = text_field(body, field) or \
+        os.path.join(user_info.work_dir, "room_assignments.csv")
+    if not os.path.isfile(path):
+        raise RequestError("The file " + path + " is not valid.")
+    return path
+
+
+# the request's options on top of the server's defaults; when repairing
+#   `previous` assignments, the individuals keep their room unless the
+#   request or the server names one
+def request_options(body, previous=None):
+    options = {x: body.get(x, getter()) for x, getter in
+               request_getters.items()}
+    if "indiv_room" not in body:
+        options["indiv_room"] = get_indiv_team_room(previous)
+    for option in text_options:
+        if not isinstance(options[option], str):
+            raise RequestError("The option " + option +
+                               " must be a string.")
+    for option, convert in number_options.items():
+        value = options[option]
+        try:
+            if isinstance(value, bool) or \
+               not isinstance(value, (int, float, str)):
+                raise ValueError()
+            options[option] = convert(value)
+        except ValueError:
+            raise RequestError("The option " + option + " must be a " +
+                               "number.")
+        if not math.isfinite(options[option]):
+            raise RequestError("The option " + option + " must be a " +
+                               "finite number.")
+        if options[option] < 0:
+            raise RequestError("The option " + option + " cannot be " +
+                               "negative.")
+        if options[option] > option_limits[option]:
+            raise RequestError("The option " + option + " can be at " +
+                               "most " + str(option_limits[option]) + ".")
+
+    if options["engine"] not in engines:
+        raise RequestError("The engine must be one of " +
+                           ", ".join(engines) + ".")
+    if options["awards_policy"] not in awards_policies:
+        raise RequestError("The awards policy must be one of " +
+                           ", ".join(awards_policies) + ".")
+    if "^" not in options["indiv_room"]:
+        raise RequestError("The individuals room must be given as " +
+                           "BUILDING^ROOM.")
+    if options["restarts"] < 1:
+        raise RequestError("There must be at least one restart.")
+    return options
+
+
+##############
+## Requests ##
+##############
+
+
+def handle_status(body):
+    return {
+        "files": {x: get_input_file(x) for x in input_kinds},
+        "loaded": service["loaded"]
+    }
+
+
+def handle_reload(body):
+    reload_tournament()
+    return handle_status(body)
+
+
+def handle_assign(body, previous=None):
+    inputs = service["inputs"]
+    options = request_options(body, previous)
+    assignments = compute_assignments(
+        inputs["teams"], inputs["orgs"], inputs["powerindices"],
+        inputs["rooms"], options["month"], options["indiv_room"],
+        engine=options["engine"], budget=options["budget"],
+        previous=previous, awards_policy=options["awards_policy"],
+        local_search=options["local_search"], restarts=options["restarts"])
+
+    if body.get("write"):
+        run_script = "serve_rooms.py " + json.dumps(options, sort_keys=True)
+        with service["lock"]:
+            write_assignments(assignments, user_info.work_dir, run_script)
+
+    return {
+        "options": options,
+        "written": bool(body.get("write")),
+        "headers": room_assignment_headers,
+        "rows": assignments["rows"],
+        "diff": assignments["diff"],
+        "improvement": assignments["improvement"]
+    }
+
+
+def handle_repair(body):
+    from repair_rooms import read_assignments
+
+    previous = read_assignments(assignments_path(body, "previous"))
+    return handle_assign(body, previous)
+
+
+def handle_validate(body):
+    from repair_rooms import read_assignment_rows
+    from validate_rooms import validate_assignments
+
+    inputs = service["inputs"]
+    violations = validate_assignments(
+        read_assignment_rows(assignments_path(body, "assignments")),
+        inputs["teams"], inputs["orgs"], inputs["powerindices"],
+        inputs["rooms"], text_field(body, "indiv_room"))
+    return {"valid": not violations, "violations": violations}
+
+
+get_handlers = {
+    "/status": handle_status
+}
+
+post_handlers = {
+    "/reload": handle_reload,
+    "/assign": handle_assign,
+    "/repair": handle_repair,
+    "/validate": handle_validate
+}
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.respond(get_handlers)
+
+    def do_POST(self):
+        self.respond(post_handlers)
+
+    def respond(self, handlers):
+        if self.path not in handlers:
+            self.send_json(404, {"status": "failed",
+                                 "error": "There is no " + self.path + "."})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict):
+                raise ValueError("The body must be a JSON object.")
+        except ValueError as error:
+            self.send_json(400, {"status": "failed", "error": str(error)})
+            return
+
+        try:
+            response = handlers[self.path](body)
+        except RequestError as error:
+            self.send_json(400, {"status": "failed", "error": str(error)})
+            return
+        except assign_errors as error:
+            self.send_json(422, {"status": "failed",
+                                 "error": type(error).__name__ + ": " +
+                                 str(error)})
+            return
+        except Exception as error:
+            self.log_error("%s", traceback.format_exc())
+            self.send_json(500, {"status": "failed",
+                                 "error": type(error).__name__ + ": " +
+                                 str(error)})
+            return
+        self.send_json(200, dict(response, status="ok"))
+
+    def send_json(self, code, response):
+        content = json.dumps(response).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+########
+# Main #
+########
+
+
+if __name__ == '__main__':
+    parse_arguments()
+    multiprocessing.set_start_method("spawn")
+
+    service["cache_dir"] = open_cache(get_cache(), user_info.work_dir)
+    reload_tournament()
+
+    server = ThreadingHTTPServer((serve_host, get_port()), RequestHandler)
+    print("Serving room assignments on http://" + serve_host + ":" +
+          str(get_port()) + ".")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopped serving.")
+    finally:
+        server.server_close()
@@ -0,0 +1,286 @@
+###########################
+# Some High Level Details #
+###########################
+
+
+# Runs `compute_assignments` over a grid of scenarios and ranks them, so
+# choosing INDIV_ROOM and which rooms to book is no longer trial and error.
+# The grid is every pair of a candidate room file (-r, repeatable) and an
+# individuals room (-i, repeatable). Scenarios run on a process pool; the
+# teams, organizations and power indices are parsed once and handed to each
+# worker when it starts. A scenario run with the partition engine only gets
+# its share of the CPUs (see `job_workers`), so with the default of one
+# worker per CPU it gets a single cluster, i.e. the greedy passes.
+
+# With the cache on, each scenario's results are cached by the hashes of its
+# input files and its options, so only new scenarios are run again.
+
+# Scenarios are ranked by failures first, then by the number of
+# organizations with a team outside their individual building, then by
+# seat utilization (higher is better). The ranking is written to
+# `sweep_report.csv` in the work directory.
+
+
+###########
+# Imports #
+###########
+
+
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import assign_rooms
+from assign_rooms import cache_modes, compute_assignments, engines, \
+    get_budget, get_cache, get_engine, get_input_file, get_month, user_info
+from cache_rooms import load_input, open_cache, read_result, result_key, \
+    write_result
+
+
+###########
+# Globals #
+###########
+
+
+sweep_passed_in = {
+    "rooms": [],
+    "indiv_rooms": [],
+    "workers": None
+}
+
+sweep_report_headers = ["rank", "rooms", "indiv_room", "status",
+                        "split_orgs", "ind_utilization", "team_utilization",
+                        "seconds"]
+
+# set in each worker by `init_worker`
+shared_inputs = None
+
+
+#####################
+## Check Arguments ##
+#####################
+
+
+def print_help():
+    print("\nUsage: [ARGUMENTS]")
+
+    print("\nArgument Options:")
+    print("  -t TEAM_CSV                  File containing team info.")
+    print("  -r ROOM_CSV                  Candidate room file (repeatable).")
+    print("  -o ORGANIZATION_CSV          File containing organization info.")
+    print("  -p POWERINDEX_CSV            File containing power indices.")
+    print("  -m MONTH                     The month of the tournament.")
+    print("  -i INDIV_ROOM                Candidate individuals room " +
+          "(repeatable).")
+    print("  -e ENGINE                    Either greedy, flow or partition.")
+    print("  -b BUDGET                    Seconds the flow engine may take.")
+    print("  -c CACHE                     Either on, off or clear.")
+    print("  -w WORKERS                   Number of worker processes.")
+
+    print("\nThe argument requirements can be found ")
+    print("at the top of `assign_rooms.py`.\n")
+    sys.exit()
+
+
+def parse_arguments():
+    if len(sys.argv) == 2 and sys.argv[1] == "-h":
+        print_help()
+
+    if len(sys.argv) % 2 == 0:
+        raise RuntimeError("Every argument must be preceded by a flag. " +
+                           "Use the -h flag to see all arguments/flags.")
+
+    file_flags = {"-t": "teams", "-o": "orgs", "-p": "powerindices"}
+    value_flags = {"-m": "month", "-e": "engine", "-b": "budget",
+                   "-c": "cache"}
+
+    for index in range(len(sys.argv))[1::2]:
+        flag, value = sys.argv[index], sys.argv[index + 1]
+        if flag in file_flags or flag == "-r":
+            if not os.path.isfile(value):
+                raise ValueError("The file " + value +
+                                 " passed in is not valid.")
+
+        if flag == "-r":
+            sweep_passed_in["rooms"].append(value)
+        elif flag == "-i":
+            sweep_passed_in["indiv_rooms"].append(value)
+        elif flag == "-w":
+            sweep_passed_in["workers"] = int(value)
+        elif flag in file_flags:
+            assign_rooms.passed_in[file_flags[flag]] = value
+        elif flag in value_flags:
+            if flag == "-e" and value not in engines:
+                raise ValueError("The engine must be one of " +
+                                 ", ".join(engines) + ".")
+            if flag == "-c" and value not in cache_modes:
+                raise ValueError("The cache must be one of " +
+                                 ", ".join(cache_modes) + ".")
+            assign_rooms.passed_in[value_flags[flag]] = value
+        else:
+            raise RuntimeError("You used an invalid flag. " +
+                               "Use the -h flag to see all arguments/flags.")
+
+
+#############
+## Metrics ##
+#############
+
+
+def assignment_metrics(assignments):
+    split_orgs = 0
+    for org in assignments["organizations"]:
+        for team in org.teams:
+            if team.teamroom.buildingid != org.indroom.buildingid:
+                split_orgs += 1
+                break
+
+    rooms = assignments["rooms"]
+    indcap = sum(x.indcap for x in rooms)
+    teamcap = sum(x.teamcap for x in rooms)
+    return {
+        "split_orgs": split_orgs,
+        "ind_utilization":
+            sum(x.indassigned for x in rooms) / indcap if indcap else 0,
+        "team_utilization":
+            sum(x.teamassigned for x in rooms) / teamcap if teamcap else 0
+    }
+
+
+def scenario_key(result):
+    return (result["status"] != "ok", result["split_orgs"],
+            -result["ind_utilization"], -result["team_utilization"])
+
+
+###############
+## Scenarios ##
+###############
+
+
+def init_worker(inputs):
+    global shared_inputs
+    shared_inputs = inputs
+
+
+# the processes each job of a pool of `workers` may start for itself (the
+#   partition engine's clusters, the local search restarts), so that the
+#   pool and its jobs together use about one process per CPU
+def job_workers(workers):
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def run_scenario(scenario):
+    rooms_name, indiv_room = scenario
+    inputs = shared_inputs
+
+    start = time.perf_counter()
+    result = {
+        "rooms": rooms_name,
+        "indiv_room": indiv_room,
+        "status": "ok",
+        "split_orgs": 0,
+        "ind_utilization": 0,
+        "team_utilization": 0
+    }
+    try:
+        assignments = compute_assignments(
+            inputs["teams"], inputs["orgs"], inputs["powerindices"],
+            inputs["rooms"][rooms_name], inputs["month"], indiv_room,
+            engine=inputs["engine"], budget=inputs["budget"],
+            workers=inputs["job_workers"])
+        result.update(assignment_metrics(assignments))
+    except (RuntimeError, ValueError) as error:
+        result["status"] = "failed: " + str(error)
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+# `inputs["files"]` holds the team, organization and power index files the
+#   inputs were parsed from
+def scenario_cache_key(inputs, scenario):
+    rooms_name, indiv_room = scenario
+    return result_key(inputs["files"] + [rooms_name],
+                      [inputs["month"], indiv_room, inputs["engine"],
+                       inputs["budget"], inputs["job_workers"]])
+
+
+# pass a `cache_dir` to reuse (and store) the results of earlier sweeps
+def run_sweep(inputs, indiv_rooms, workers=None, cache_dir=None):
+    scenarios = list(product(inputs["rooms"], indiv_rooms))
+    workers = workers or os.cpu_count()
+    inputs = dict(inputs, job_workers=job_workers(workers))
+
+    results = []
+    pending = scenarios
+    if cache_dir is not None:
+        pending = []
+        for scenario in scenarios:
+            result = read_result(cache_dir, "sweep",
+                                 scenario_cache_key(inputs, scenario))
+            if result is None:
+                pending.append(scenario)
+            else:
+                results.append(result)
+    if not pending:
+        return sorted(results, key=scenario_key)
+
+    # a few chunks per worker keeps the pool busy without paying for a
+    #   round trip per scenario
+    chunksize = max(1, len(pending) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(inputs,)) as executor:
+        new_results = list(executor.map(run_scenario, pending,
+                                        chunksize=chunksize))
+
+    if cache_dir is not None:
+        for scenario, result in zip(pending, new_results):
+            write_result(cache_dir, "sweep",
+                         scenario_cache_key(inputs, scenario), result)
+    return sorted(results + new_results, key=scenario_key)
+
+
+def write_sweep_report(results, work_dir):
+    with open(work_dir + "/sweep_report.csv", "w") as file:
+        writer = csv.writer(file)
+        writer.writerow(sweep_report_headers)
+        for rank, result in enumerate(results, 1):
+            writer.writerow([rank] + [result[x]
+                                      for x in sweep_report_headers[1:]])
+
+
+########
+# Main #
+########
+
+
+if __name__ == '__main__':
+    parse_arguments()
+
+    room_files = sweep_passed_in["rooms"] or [assign_rooms.default["rooms"]]
+    indiv_rooms = sweep_passed_in["indiv_rooms"] or \
+        [assign_rooms.default["indiv_room"]]
+
+    cache_dir = open_cache(get_cache(), user_info.work_dir)
+    inputs = {
+        "teams": load_input("teams", get_input_file("teams"), cache_dir),
+        "orgs": load_input("orgs", get_input_file("orgs"), cache_dir),
+        "powerindices": load_input("powerindices",
+                                   get_input_file("powerindices"), cache_dir),
+        "rooms": {x: load_input("rooms", x, cache_dir) for x in room_files},
+        "files": [get_input_file(x) for x in ["teams", "orgs",
+                                              "powerindices"]],
+        "month": get_month(),
+        "engine": get_engine(),
+        "budget": get_budget()
+    }
+
+    results = run_sweep(inputs, indiv_rooms, sweep_passed_in["workers"],
+                        cache_dir)
+    write_sweep_report(results, user_info.work_dir)
+
+    best = results[0]
+    print("Best scenario: rooms " + best["rooms"] + ", individuals in " +
+          best["indiv_room"] + " (" + best["status"] + ").")
@@ -0,0 +1,287 @@
+###########################
+# Some High Level Details #
+###########################
+
+
+# Checks a `room_assignments.csv`, whether it came from `assign_rooms.py` or
+# was edited by hand, against the original inputs and the rules at the top
+# of `assign_rooms.py`:
+
+# - every registered team appears exactly once, in its own organization,
+#   and every room it names is in the room list;
+# - an organization has a single room for the individual round, the guts
+#   round and the awards ceremony;
+# - an organization's teams are in different team rooms, except for the
+#   individuals, who all share one team room, which is also their
+#   individual room (and INDIV_ROOM, if it is passed in);
+# - a team room has at most one power team, and the power indices only
+#   list teams of their own organization;
+# - no room holds more teams than its capacity for any round.
+
+# Each rule is a count over one grouping of the rows (by team, by room, or
+# by organization and room), built in one go with a Counter, so checking
+# 100k teams takes about as long as reading them. Every violation is listed,
+# and the script exits with status 1 if there were any, so it can gate a
+# generated file.
+
+
+#########################
+# Argument Requirements #
+#########################
+
+
+# ASSIGNMENTS_CSV: the file to check, `room_assignments.csv` in the work
+#   directory by default.
+
+# INDIV_ROOM: where the individuals should be; without it, they only have
+#   to share a room.
+
+# TEAM_CSV, ROOM_CSV, ORGANIZATION_CSV, POWERINDEX_CSV, CACHE: as in
+#   `assign_rooms.py`.
+
+
+###########
+# Imports #
+###########
+
+
+import os
+import sys
+from collections import Counter
+from operator import itemgetter
+
+import assign_rooms
+from assign_rooms import cache_modes, get_cache, get_input_file, \
+    individual_org_name, user_info
+from cache_rooms import load_input, open_cache
+from repair_rooms import read_assignment_rows
+
+
+###########
+# Globals #
+###########
+
+
+validate_passed_in = {
+    "assignments": None,
+    "indiv_room": None
+}
+
+# the rounds where an organization sits in a single room, with the room
+#   field holding each round's capacity; these prefixes match the output
+#   columns ("indbuilding", "indroom")
+org_round_caps = [("ind", "indcap"), ("guts", "gutscap"),
+                  ("awards", "awardscap")]
+
+
+#####################
+## Check Arguments ##
+#####################
+
+
+def print_help():
+    print("\nUsage: [ARGUMENTS]")
+
+    print("\nArgument Options:")
+    print("  -a ASSIGNMENTS_CSV           The assignments to check.")
+    print("  -t TEAM_CSV                  File containing team info.")
+    print("  -r ROOM_CSV                  File containing room info.")
+    print("  -o ORGANIZATION_CSV          File containing organization info.")
+    print("  -p POWERINDEX_CSV            File containing power indices.")
+    print("  -i INDIV_ROOM                Where individuals should be.")
+    print("  -c CACHE                     Either on, off or clear.")
+
+    print("\nThe argument requirements can be found ")
+    print("at the top of `validate_rooms.py`.\n")
+    sys.exit()
+
+
+def parse_arguments():
+    if len(sys.argv) == 2 and sys.argv[1] == "-h":
+        print_help()
+
+    if len(sys.argv) % 2 == 0:
+        raise RuntimeError("Every argument must be preceded by a flag. " +
+                           "Use the -h flag to see all arguments/flags.")
+
+    file_flags = {"-t": "teams", "-r": "rooms", "-o": "orgs",
+                  "-p": "powerindices"}
+
+    for index in range(len(sys.argv))[1::2]:
+        flag, value = sys.argv[index], sys.argv[index + 1]
+        if flag in file_flags or flag == "-a":
+            if not os.path.isfile(value):
+                raise ValueError("The file " + value +
+                                 " passed in is not valid.")
+
+        if flag == "-a":
+            validate_passed_in["assignments"] = value
+        elif flag == "-i":
+            validate_passed_in["indiv_room"] = value
+        elif flag in file_flags:
+            assign_rooms.passed_in[file_flags[flag]] = value
+        elif flag == "-c":
+            if value not in cache_modes:
+                raise ValueError("The cache must be one of " +
+                                 ", ".join(cache_modes) + ".")
+            assign_rooms.passed_in["cache"] = value
+        else:
+            raise RuntimeError("You used an invalid flag. " +
+                               "Use the -h flag to see all arguments/flags.")
+
+
+def get_assignments_file():
+    return validate_passed_in["assignments"] or \
+        os.path.join(user_info.work_dir, "room_assignments.csv")
+
+
+################
+## Validation ##
+################
+
+
+def room_name(room_key):
+    return " ".join(room_key)
+
+
+# a getter for the (building, room) of a round, to map over the rows; with
+#   `orgid`, for grouping by organization and room
+def room_column(round, orgid=False):
+    columns = [round + "building", round + "room"]
+    return itemgetter(*(["orgid"] + columns if orgid else columns))
+
+
+def org_name(orgs, orgid):
+    return orgs.get(int(orgid), orgid)
+
+
+# `rows` are dicts keyed by the output headers (see `read_assignment_rows`),
+#   and the rest are parsed inputs, as for `compute_assignments`, along with
+#   INDIV_ROOM if it should be checked; returns a list of violations, which
+#   is empty if the assignment is valid
+def validate_assignments(rows, teams, orgs, powerindices, rooms,
+                         indiv_room=None):
+    violations = []
+    room_lookup = {(x.building, x.number): x for x in rooms}
+    team_orgs = {x.teamid: x.orgid for x in teams}
+    # a power index only applies to the organization's own teams, as in
+    #   `team_list_to_org_list`
+    power_teams = {(orgid, teamid) for orgid, entry in powerindices.items()
+                   if entry["index"] < 100 for teamid in entry["teamids"]}
+
+    # every rule is a count over one grouping of the rows, so each one is a
+    #   single Counter (or set) built over a column or two
+    team_counts = Counter(map(int, map(itemgetter("teamid"), rows)))
+    for teamid in team_orgs:
+        if team_counts[teamid] != 1:
+            violations.append("teams: the team with id " + str(teamid) +
+                              " has " + str(team_counts[teamid]) + " rows.")
+    for row in rows:
+        teamid = int(row["teamid"])
+        if teamid not in team_orgs:
+            violations.append("teams: the team " + row["teamname"] +
+                              " is not registered.")
+        elif team_orgs[teamid] != int(row["orgid"]):
+            violations.append("teams: the team " + row["teamname"] +
+                              " is listed under organization " +
+                              row["orgid"] + " instead of " +
+                              str(team_orgs[teamid]) + ".")
+
+    for round, cap in [("team", "teamcap")] + org_round_caps:
+        loads = Counter(map(room_column(round), rows))
+
+        for room_key, load in sorted(loads.items()):
+            room = room_lookup.get(room_key)
+            if not any(room_key):
+                violations.append("rooms: " + str(load) + " team(s) have " +
+                                  "no " + round + " room.")
+            elif room is None:
+                violations.append("rooms: the " + round + " room " +
+                                  room_name(room_key) +
+                                  " is not in the room list.")
+            elif load > getattr(room, cap):
+                violations.append(round + ": " + room_name(room_key) +
+                                  " holds " + str(load) + " teams but " +
+                                  "only seats " + str(getattr(room, cap)) +
+                                  ".")
+
+        if round == "team":
+            continue
+
+        # an organization with more than one distinct room is split
+        org_room_counts = Counter(
+            map(itemgetter(0), set(map(room_column(round, True), rows))))
+        for orgid, count in org_room_counts.items():
+            if count > 1:
+                violations.append(round + ": the organization " +
+                                  org_name(orgs, orgid) + " is split " +
+                                  "across " + str(count) + " rooms.")
+
+    # the individuals share their team room, which is their individual room
+    indiv_rows = [x for x in rows if x["orgname"] == individual_org_name]
+    indiv_team_rooms = set(map(room_column("team"), indiv_rows))
+    expected_rooms = set(map(room_column("ind"), indiv_rows))
+    if indiv_room is not None:
+        expected_rooms = {tuple(indiv_room.split("^"))}
+    if indiv_team_rooms and indiv_team_rooms != expected_rooms:
+        violations.append("team: the individuals are in " +
+                          ", ".join(map(room_name, sorted(indiv_team_rooms))) +
+                          " instead of " +
+                          ", ".join(map(room_name, sorted(expected_rooms))) +
+                          ".")
+
+    for orgid, teamid in sorted(power_teams):
+        if team_orgs.get(teamid) != orgid:
+            violations.append("power: the organization " +
+                              org_name(orgs, orgid) + " lists the team " +
+                              "with id " + str(teamid) + ", which is " +
+                              ("in organization " +
+                               org_name(orgs, team_orgs[teamid])
+                               if teamid in team_orgs
+                               else "not registered") + ".")
+
+    org_rows = [x for x in rows if x["orgname"] != individual_org_name]
+
+    shared = Counter(map(room_column("team", True), org_rows))
+    for (orgid, *room_key), count in shared.items():
+        if count > 1:
+            violations.append("team: the organization " +
+                              org_name(orgs, orgid) + " has " + str(count) +
+                              " teams in " + room_name(room_key) + ".")
+
+    power = Counter(map(room_column("team"),
+                        [x for x in org_rows
+                         if (int(x["orgid"]), int(x["teamid"]))
+                         in power_teams]))
+    for room_key, count in power.items():
+        if count > 1:
+            violations.append("team: " + room_name(room_key) + " has " +
+                              str(count) + " power teams.")
+
+    return violations
+
+
+########
+# Main #
+########
+
+
+if __name__ == '__main__':
+    parse_arguments()
+
+    cache_dir = open_cache(get_cache(), user_info.work_dir)
+    inputs = {x: load_input(x, get_input_file(x), cache_dir)
+              for x in ["teams", "orgs", "powerindices", "rooms"]}
+
+    violations = validate_assignments(
+        read_assignment_rows(get_assignments_file()), inputs["teams"],
+        inputs["orgs"], inputs["powerindices"], inputs["rooms"],
+        validate_passed_in["indiv_room"])
+
+    if violations:
+        print("Found " + str(len(violations)) + " violation(s):")
+        for violation in violations:
+            print("  " + violation)
+        sys.exit(1)
+
+    print("The assignment satisfies every rule.")
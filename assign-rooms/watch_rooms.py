@@ -0,0 +1,313 @@
+###########################
+# Some High Level Details #
+###########################
+
+
+# Keeps `room_assignments.csv` up to date while the input CSVs are being
+# edited. It runs once at the start, then polls the inputs' modification
+# times and sizes every POLL_SECONDS. After a change, it waits until the
+# files have been quiet for QUIET_SECONDS, so a burst of saves (or an editor
+# writing a file in several steps) only triggers one run.
+
+# Parsed inputs stay in memory between runs, and a run skips the work a
+# change cannot affect:
+
+# - a file whose contents did not change (e.g. it was only touched) is not
+#   parsed again, and if no contents changed nothing else runs;
+# - only the changed files are parsed again;
+# - the output is only rewritten if the rows changed, and it is written to a
+#   temporary file first and moved into place, so readers never see half of
+#   it.
+
+# The assignment itself is not incremental: after any change,
+# `compute_assignments` runs in full (the feasibility check, every pass,
+# and the local search if it is on). Every pass depends on the ones before
+# it, and an edit to any input can change the order the organizations are
+# placed in, so there is no stage that is safe to keep. For large
+# tournaments, a repair (-a) keeps more of the previous output in place.
+
+# If a run fails, e.g. because a file was saved halfway through an edit or
+# the inputs cannot be assigned, the error is printed, the last output is
+# kept, and the next change is picked up as usual. The files that were not
+# parsed because of the failure (the broken one, and any changed files
+# after it) stay pending, and are parsed along with the next change. Stop
+# it with Ctrl-C.
+
+
+#########################
+# Argument Requirements #
+#########################
+
+
+# POLL_SECONDS: how often to check the inputs for changes, "0.2" by default.
+
+# QUIET_SECONDS: how long the inputs must go unchanged before a run starts,
+#   "0.3" by default.
+
+# Everything else is as in `assign_rooms.py`, except that there is no
+# profiling. With PREVIOUS_ASSIGNMENTS_CSV, that file is watched too.
+
+
+###########
+# Imports #
+###########
+
+
+import os
+import sys
+import time
+
+import assign_rooms
+from assign_rooms import awards_policies, cache_modes, compute_assignments, \
+    engines, extra_outputs, get_awards_policy, get_budget, get_cache, \
+    get_engine, get_indiv_team_room, get_input_file, get_local_search, \
+    get_month, get_outputs, get_restarts, user_info, write_assignments
+from cache_rooms import file_digest, load_input, open_cache
+
+
+###########
+# Globals #
+###########
+
+
+watch_default = {
+    "poll": "0.2",
+    "quiet": "0.3"
+}
+
+watch_passed_in = {
+    "poll": None,
+    "quiet": None
+}
+
+input_kinds = ["teams", "orgs", "powerindices", "rooms"]
+
+# what a run may trip over when a file is saved halfway through an edit, on
+#   top of the usual errors for inputs that cannot be assigned
+watch_errors = (RuntimeError, ValueError, KeyError, IndexError, OSError)
+
+
+#####################
+## Check Arguments ##
+#####################
+
+
+def print_help():
+    print("\nUsage: [ARGUMENTS]")
+
+    print("\nArgument Options:")
+    print("  -t TEAM_CSV                  File containing team info.")
+    print("  -r ROOM_CSV                  File containing room info.")
+    print("  -o ORGANIZATION_CSV          File containing organization info.")
+    print("  -p POWERINDEX_CSV            File containing power indices.")
+    print("  -m MONTH                     The month of the tournament.")
+    print("  -i INDIV_ROOM                Where individuals will compete.")
+    print("  -e ENGINE                    Either greedy, flow or partition.")
+    print("  -b BUDGET                    Seconds the flow engine may take.")
+    print("  -a PREVIOUS_ASSIGNMENTS_CSV  Earlier assignments to repair.")
+    print("  -c CACHE                     Either on, off or clear.")
+    print("  -A AWARDS_POLICY             Either spread or bestfit.")
+    print("  -l LOCAL_SEARCH_BUDGET       Seconds to spend improving.")
+    print("  -R RESTARTS                  Number of local searches to run.")
+    print("  -O OUTPUTS                   Extra outputs, e.g. rosters^jsonl.")
+    print("  -s POLL_SECONDS              Seconds between checks for changes.")
+    print("  -q QUIET_SECONDS             Seconds to wait for edits to stop.")
+
+    print("\nThe argument requirements can be found ")
+    print("at the top of `watch_rooms.py`.\n")
+    sys.exit()
+
+
+def parse_arguments():
+    if len(sys.argv) == 2 and sys.argv[1] == "-h":
+        print_help()
+
+    if len(sys.argv) % 2 == 0:
+        raise RuntimeError("Every argument must be preceded by a flag. " +
+                           "Use the -h flag to see all arguments/flags.")
+
+    file_flags = {"-t": "teams", "-r": "rooms", "-o": "orgs",
+                  "-p": "powerindices", "-a": "previous"}
+    value_flags = {"-m": "month", "-i": "indiv_room", "-e": "engine",
+                   "-b": "budget", "-c": "cache", "-A": "awards_policy",
+                   "-l": "local_search", "-R": "restarts", "-O": "outputs"}
+    watch_flags = {"-s": "poll", "-q": "quiet"}
+
+    for index in range(len(sys.argv))[1::2]:
+        flag, value = sys.argv[index], sys.argv[index + 1]
+        if flag in file_flags:
+            if not os.path.isfile(value):
+                raise ValueError("The file " + value +
+                                 " passed in is not valid.")
+            assign_rooms.passed_in[file_flags[flag]] = value
+        elif flag in value_flags:
+            if flag == "-e" and value not in engines:
+                raise ValueError("The engine must be one of " +
+                                 ", ".join(engines) + ".")
+            if flag == "-c" and value not in cache_modes:
+                raise ValueError("The cache must be one of " +
+                                 ", ".join(cache_modes) + ".")
+            if flag == "-A" and value not in awards_policies:
+                raise ValueError("The awards policy must be one of " +
+                                 ", ".join(awards_policies) + ".")
+            if flag == "-O" and not set(value.split("^")) <= \
+               set(extra_outputs):
+                raise ValueError("The outputs must be among " +
+                                 ", ".join(extra_outputs) + ".")
+            assign_rooms.passed_in[value_flags[flag]] = value
+        elif flag in watch_flags:
+            watch_passed_in[watch_flags[flag]] = value
+        else:
+            raise RuntimeError("You used an invalid flag. " +
+                               "Use the -h flag to see all arguments/flags.")
+
+
+def get_watch_option(option):
+    if watch_passed_in[option] is not None:
+        return float(watch_passed_in[option])
+    return float(watch_default[option])
+
+
+#############
+## Polling ##
+#############
+
+
+# the files to watch, by kind; the previous assignments only when repairing
+def watched_files():
+    files = {x: get_input_file(x) for x in input_kinds}
+    if assign_rooms.passed_in["previous"]:
+        files["previous"] = assign_rooms.passed_in["previous"]
+    return files
+
+
+# a file that is missing (e.g. while an editor replaces it) has no stamp
+def file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+# returns the kinds of the files whose stamps changed since the last call,
+#   and remembers the new stamps
+def changed_files(files, stamps):
+    changed = set()
+    for kind, path in files.items():
+        stamp = file_stamp(path)
+        if stamp != stamps.get(kind):
+            stamps[kind] = stamp
+            changed.add(kind)
+    return changed
+
+
+def wait_for_quiet(files, stamps, changed, quiet):
+    while True:
+        time.sleep(quiet)
+        more = changed_files(files, stamps)
+        if not more:
+            return changed
+        changed |= more
+
+
+############
+## Stages ##
+############
+
+
+# parses the pending files again, skipping those whose contents are the
+#   same as last time; a kind stops being pending once it is parsed, so if
+#   one fails, it and the kinds after it are tried again on the next run;
+#   returns the kinds that were parsed
+def reload_inputs(state, files, cache_dir):
+    reloaded = []
+    for kind in sorted(state["pending"]):
+        digest = file_digest(files[kind])
+        if digest == state["digests"].get(kind):
+            state["pending"].discard(kind)
+            continue
+
+        if kind == "previous":
+            from repair_rooms import read_assignments
+
+            state["inputs"][kind] = read_assignments(files[kind])
+        else:
+            state["inputs"][kind] = load_input(kind, files[kind], cache_dir)
+        state["digests"][kind] = digest
+        state["pending"].discard(kind)
+        reloaded.append(kind)
+    return reloaded
+
+
+def recompute(state):
+    inputs = state["inputs"]
+    return compute_assignments(
+        inputs["teams"], inputs["orgs"], inputs["powerindices"],
+        inputs["rooms"], get_month(),
+        get_indiv_team_room(inputs.get("previous")),
+        engine=get_engine(), budget=get_budget(),
+        previous=inputs.get("previous"), awards_policy=get_awards_policy(),
+        local_search=get_local_search(), restarts=get_restarts())
+
+
+def update(state, files, changed, cache_dir, run_script):
+    start = time.perf_counter()
+    state["pending"] |= changed
+    changed = set(state["pending"])
+    try:
+        reloaded = reload_inputs(state, files, cache_dir)
+        if not reloaded and not state["failed"]:
+            return
+        assignments = recompute(state)
+    except watch_errors as error:
+        state["failed"] = True
+        print("Could not assign after the change to " +
+              ", ".join(sorted(changed)) + "; keeping the last output.\n  " +
+              type(error).__name__ + ": " + str(error))
+        return
+    state["failed"] = False
+
+    if assignments["rows"] == state["rows"]:
+        print("The assignments did not change (" +
+              "%.3f" % (time.perf_counter() - start) + " s).")
+        return
+
+    write_assignments(assignments, user_info.work_dir, run_script,
+                      get_outputs())
+    state["rows"] = assignments["rows"]
+    print("Updated room_assignments.csv after the change to " +
+          ", ".join(reloaded) + " (" +
+          "%.3f" % (time.perf_counter() - start) + " s).")
+
+
+########
+# Main #
+########
+
+
+if __name__ == '__main__':
+    parse_arguments()
+
+    poll = get_watch_option("poll")
+    quiet = get_watch_option("quiet")
+    run_script = " ".join(sys.argv)
+
+    cache_dir = open_cache(get_cache(), user_info.work_dir)
+    files = watched_files()
+    state = {"stamps": {}, "digests": {}, "inputs": {}, "pending": set(),
+             "rows": None, "failed": True}
+
+    print("Watching " + ", ".join(files.values()) + ".")
+    try:
+        changed = changed_files(files, state["stamps"])
+        while True:
+            if changed:
+                update(state, files, changed, cache_dir, run_script)
+            time.sleep(poll)
+            changed = changed_files(files, state["stamps"])
+            if changed:
+                changed = wait_for_quiet(files, state["stamps"], changed,
+                                         quiet)
+    except KeyboardInterrupt:
+        print("Stopped watching.")
@@ -15,6 +15,15 @@
 # are used by the LaTeX file.
 # The workflow is `python3 generate_orders.py [ORDERS_CSV]` =>
 # `pdflatex orders.tex` (or equivalent).
+# With `-f pdf`, `orders.pdf` is written directly instead, with the same
+# layout (see `pdf_orders.py`), so neither the LaTeX step nor a TeX install
+# is needed.
+
+# Every kind of slip is a label type in `label_types`, with its own output
+# file, grid of label positions on a page, title, and the order columns it
+# lists. Each order is parsed once, and a single pass over the orders hands
+# it to every label type, so adding a kind of slip (room cards, badges, ...)
+# only means registering it; its columns must be in ORDERS_CSV.
 
 
 #########################
@@ -27,6 +36,15 @@
 # ORDERS_CSV: it must have the headers:
 #   [orgid, orgname, xs, s, m, l, xl, xxl, cheese, pepperoni].
 
+# LABEL_TYPES: the label types to generate, delimited by a "^", e.g.
+#   "shirt^pizza" (the default is every one of them), each at most once.
+#   With the LaTeX output, the files of the other label types are emptied,
+#   since `orders.tex` inputs all of them and would print stale slips
+#   otherwise.
+
+# FORMAT: either "latex" (the default), for the text files used by
+#   `orders.tex`, or "pdf", for `orders.pdf`.
+
 
 ###########
 # Imports #
@@ -37,25 +55,51 @@ import sys
 import os
 from itertools import product
 
+from pdf_orders import PdfLabels, write_pdf
+
 
 ###########
 # Globals #
 ###########
 
 default = {
-    "orders": "orders.csv"
+    "orders": "orders.csv",
+    "label_types": None,
+    "format": "latex"
 }
 
 passed_in = {
-    "orders": None
+    "orders": None,
+    "label_types": None,
+    "format": None
 }
 
-shirt_order_xs = [0.5, 4.25]
-shirt_order_ys = [0.5, 2.5, 4.5, 6.5, 8.5]
-
-shirt_order_yxs = list(product(shirt_order_ys, shirt_order_xs))
-
-shirt_orders_per_page = len(shirt_order_yxs)
+formats = ["latex", "pdf"]
+
+pdf_file = "orders.pdf"
+
+# two columns of five 3.75in x 2in labels on a letter page, in inches
+label_xs = [0.5, 4.25]
+label_ys = [0.5, 2.5, 4.5, 6.5, 8.5]
+
+# each label type lists `lines` of (caption, order column), and only gets a
+#   label for the orders whose counts in those columns add up to more than
+#   zero; positions are filled row by row
+label_types = {
+    "shirt": {
+        "file": "shirt_orders.txt",
+        "title": "Shirt Orders",
+        "lines": [("S", "s"), ("M", "m"), ("L", "l"), ("XL", "xl"),
+                  ("XXL", "xxl")],
+        "yxs": list(product(label_ys, label_xs))
+    },
+    "pizza": {
+        "file": "pizza_orders.txt",
+        "title": "Pizza Orders",
+        "lines": [("Cheese", "cheese"), ("Pepperoni", "pepperoni")],
+        "yxs": list(product(label_ys, label_xs))
+    }
+}
 
 
 ##################
@@ -75,9 +119,11 @@ def print_help():
 
     print("\nArgument Options:")
     print("  -r ORDERS_CSV                 File containing orders.")
+    print("  -l LABEL_TYPES                Label types, e.g. shirt^pizza.")
+    print("  -f FORMAT                     Either latex or pdf.")
 
     print("\nThe requirements for the various arguments can be found")
-    print("at the top of `generate_rooms.py`.\n")
+    print("at the top of `generate_orders.py`.\n")
     sys.exit()
 
 
@@ -95,6 +141,21 @@ def parse_arguments():
             if not os.path.isfile(sys.argv[index + 1]):
                 raise ValueError("The file " + sys.argv[index + 1] +  " passed in is not valid.")
             passed_in["orders"] = sys.argv[index + 1]
+        elif sys.argv[index] == "-l":
+            names = sys.argv[index + 1].split("^")
+            for label_type in names:
+                if label_type not in label_types:
+                    raise ValueError("The label types must be among " +
+                                     ", ".join(label_types) + ".")
+            if len(set(names)) < len(names):
+                raise ValueError("Every label type can only be listed " +
+                                 "once.")
+            passed_in["label_types"] = sys.argv[index + 1]
+        elif sys.argv[index] == "-f":
+            if sys.argv[index + 1] not in formats:
+                raise ValueError("The format must be one of " +
+                                 ", ".join(formats) + ".")
+            passed_in["format"] = sys.argv[index + 1]
         else:
             raise RuntimeError("You used an invalid flag. Use the -h flag to see all arguments/flags.")
 
@@ -128,37 +189,118 @@ def latex_escape(s):
 ############
 
 
-def orders_file_to_object(orders_file):
-    orders = list(csv.DictReader(open(orders_file, "r")))
-    orders.sort(key=lambda o: o['orgname'].lower())
+def get_label_types():
+    if passed_in["label_types"]:
+        return passed_in["label_types"].split("^")
+    return list(label_types)
+
+
+def get_format():
+    return passed_in["format"] if passed_in["format"] else default["format"]
+
+
+# the columns holding counts, for the given label types
+def count_columns(names):
+    return sorted({column for name in names
+                   for _, column in label_types[name]["lines"]})
+
+
+# each order is parsed once: the organization name, escaped for LaTeX, and
+#   every count as an int
+def parse_order(row, columns):
+    return {
+        "orgname": row["orgname"],
+        "label_name": latex_escape(row["orgname"]),
+        "counts": {x: int(row[x]) for x in columns}
+    }
+
+
+def orders_file_to_object(orders_file, columns):
+    with open(orders_file, "r") as file:
+        orders = [parse_order(x, columns) for x in csv.DictReader(file)]
+    orders.sort(key=lambda o: o["orgname"].lower())
     return orders
 
 
-def shirt_order_string(x, y, order):
-    return "\\mylabel{%f}{%f}{%s\\\\%s}{S: %d\\\\M: %d\\\\L: %d\\\\XL: %d\\\\XXL: %d}" % (
-        x,
-        y,
-        "\\underline{Shirt Orders}",
-        latex_escape(order["orgname"]),
-        int(order["s"]),
-        int(order["m"]),
-        int(order["l"]),
-        int(order["xl"]),
-        int(order["xxl"]),
-    )
+############
+## Labels ##
+############
 
 
-def pizza_order_string(x, y, order):
-    return "\\mylabel{%f}{%f}{%s\\\\%s}{Cheese: %d\\\\Pepperoni: %d}" % (
+def label_string(x, y, label_type, order):
+    content = "\\\\".join("%s: %d" % (caption, order["counts"][column])
+                          for caption, column in label_type["lines"])
+    return "\\mylabel{%f}{%f}{%s\\\\%s}{%s}" % (
         x,
         y,
-        "\\underline{Pizza Orders}",
-        latex_escape(order["orgname"]),
-        int(order["cheese"]),
-        int(order["pepperoni"]),
+        "\\underline{" + label_type["title"] + "}",
+        order["label_name"],
+        content,
     )
 
 
+# the text file of one label type, for `orders.tex`
+class LatexLabels:
+    def __init__(self, file):
+        self.file = file
+
+    def flush(self):
+        print("\\myflush", file=self.file)
+
+    def label(self, x, y, label_type, order):
+        print(label_string(x, y, label_type, order), file=self.file)
+
+
+# one label type, filled a page at a time; a page is flushed before the
+#   first order that could start it, whether or not that order gets a label
+class LabelSheet:
+    def __init__(self, label_type, output):
+        self.label_type = label_type
+        self.output = output
+        self.page_index = 0
+        self.page_flushed = False
+
+    def add(self, order):
+        yxs = self.label_type["yxs"]
+        if self.page_index % len(yxs) == 0 and not self.page_flushed:
+            self.output.flush()
+            self.page_flushed = True
+
+        counts = order["counts"]
+        if sum(counts[x] for _, x in self.label_type["lines"]) > 0:
+            y, x = yxs[self.page_index]
+            self.output.label(x, y, self.label_type, order)
+
+            self.page_index = (1 + self.page_index) % len(yxs)
+            self.page_flushed = False
+
+
+def fill_sheets(orders, sheets):
+    for order in orders:
+        for sheet in sheets:
+            sheet.add(order)
+
+
+# a single pass over the orders, handing each one to every label type
+def write_labels(orders, names, output_format="latex"):
+    if output_format == "pdf":
+        outputs = [PdfLabels() for _ in names]
+        fill_sheets(orders, [LabelSheet(label_types[x], y)
+                             for x, y in zip(names, outputs)])
+        write_pdf([page for x in outputs for page in x.pages], pdf_file)
+        return
+
+    # every label type's file is opened, so the ones not selected are left
+    #   empty
+    files = {x: open(y["file"], "w") for x, y in label_types.items()}
+    try:
+        fill_sheets(orders, [LabelSheet(label_types[x], LatexLabels(files[x]))
+                             for x in names])
+    finally:
+        for file in files.values():
+            file.close()
+
+
 ########
 # Main #
 ########
@@ -169,36 +311,6 @@ if __name__ == '__main__':
 
     order_file = passed_in["orders"] if passed_in["orders"] \
         else default["orders"]
-    orders = orders_file_to_object(order_file)
-
-    with open("shirt_orders.txt", "w") as f:
-        shirt_page_index = 0
-        page_flushed = False
-        for order in orders:
-            if shirt_page_index % shirt_orders_per_page == 0 \
-               and not page_flushed:
-                print("\\myflush", file=f)
-                page_flushed = True
-
-            if int(order["s"]) + int(order["m"]) + int(order["l"]) + int(order["xl"]) + int(order["xxl"]) > 0:
-                y, x = shirt_order_yxs[shirt_page_index]
-                print(shirt_order_string(x, y, order), file=f)
-
-                shirt_page_index = (1 + shirt_page_index) % shirt_orders_per_page
-                page_flushed = False
-
-    with open("pizza_orders.txt", "w") as f:
-        pizza_page_index = 0
-        page_flushed = False
-        for order in orders:
-            if pizza_page_index % shirt_orders_per_page == 0 \
-               and not page_flushed:
-                print("\\myflush", file=f)
-                page_flushed = True
-
-            if int(order["cheese"]) + int(order["pepperoni"]) > 0:
-                y, x = shirt_order_yxs[pizza_page_index]
-                print(pizza_order_string(x, y, order), file=f)
-
-                pizza_page_index = (1 + pizza_page_index) % shirt_orders_per_page
-                page_flushed = False
+    names = get_label_types()
+    orders = orders_file_to_object(order_file, count_columns(names))
+    write_labels(orders, names, get_format())
@@ -0,0 +1,294 @@
+##############
+# High Level #
+##############
+
+# Writes the labels of `generate_orders.py` straight to a PDF (`-f pdf`),
+# so that `orders.pdf` comes out without a `pdflatex orders.tex` round trip
+# or a TeX install.
+
+# The layout follows `\mylabel` in `orders.tex`: a 3.75in x 2in box with a
+# hairline border at each label position on a letter page, and, vertically
+# centered in it and flush left, the underlined title and the organization
+# name in large bold type, then one small line per count. Long organization
+# names wrap at the width of the box, as they would in LaTeX.
+
+# The text is set in Helvetica and Helvetica-Bold, two of the fonts every
+# PDF reader has, so nothing is embedded; their widths (for wrapping and
+# underlining) are in `font_widths`, taken from the Adobe font metrics. The
+# text is encoded as WinAnsi, and characters outside of it become "?".
+
+# A page is started at every `\myflush`, so the pages are the ones the
+# LaTeX file would give, and the label types follow each other in order.
+# Without any labels, a single blank page is written, since a PDF needs at
+# least one page for most readers to open it.
+
+
+###########
+# Imports #
+###########
+
+import zlib
+from itertools import repeat
+
+
+###########
+# Globals #
+###########
+
+# in points, with the origin at the bottom left of the page
+page_width = 612
+page_height = 792
+inch = 72
+
+box_width = 3.75 * inch
+box_height = 2 * inch
+box_rule = 0.05
+
+# the tcolorbox padding on the left and right: boxsep plus the margin
+pad_x = 5 * inch / 25.4
+
+text_width = box_width - 2 * (box_rule + pad_x)
+
+# (font, size, distance between baselines) for the title and name lines,
+#   like \large\textbf, and for the count lines, like \small
+heading_style = ("F2", 12, 14)
+count_style = ("F1", 9, 11)
+
+underline_offset = 1.5
+underline_rule = 0.4
+
+# the page contents compress well even at the fastest level
+compress_level = 1
+
+fonts = {
+    "F1": "Helvetica",
+    "F2": "Helvetica-Bold"
+}
+
+# height above and depth below the baseline, per point of font size
+font_ascent = 0.718
+font_descent = 0.207
+
+# widths in thousandths of a point size, of the characters " " to "~"
+font_widths = {
+    "F1": [
+        278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278,
+        333, 278, 278, 556, 556, 556, 556, 556, 556, 556, 556, 556, 556,
+        278, 278, 584, 584, 584, 556, 1015, 667, 667, 722, 722, 667, 611,
+        778, 722, 278, 500, 667, 556, 833, 722, 778, 667, 778, 722, 667,
+        611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556, 333,
+        556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833,
+        556, 556, 556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500,
+        334, 260, 334, 584
+    ],
+    "F2": [
+        278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278,
+        333, 278, 278, 556, 556, 556, 556, 556, 556, 556, 556, 556, 556,
+        333, 333, 584, 584, 584, 611, 975, 722, 722, 722, 722, 667, 611,
+        778, 722, 278, 556, 722, 611, 833, 722, 778, 667, 778, 722, 667,
+        611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556, 333,
+        556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889,
+        611, 611, 611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500,
+        389, 280, 389, 584
+    ]
+}
+
+# the curly quotes, and any other character outside of " " to "~"
+quote_widths = {"F1": 333, "F2": 500}
+other_width = 556
+
+# every font's widths by character, so that measuring text is a lookup per
+#   character
+char_widths = {
+    font: dict(zip(map(chr, range(32, 127)), widths),
+               **{"\u201c": quote_widths[font], "\u201d": quote_widths[font]})
+    for font, widths in font_widths.items()
+}
+
+
+##########
+## Text ##
+##########
+
+
+# turns straight double quotes into curly ones, pairing them up like
+#   `latex_escape` in `generate_orders.py`
+def curly_quotes(s):
+    tokens = s.split('"')
+    l = [tokens[0]]
+    for i, token in enumerate(tokens[1:]):
+        l.append("\u201c" if i % 2 == 0 else "\u201d")
+        l.append(token)
+    return ''.join(l)
+
+
+def string_width(s, font, size):
+    return sum(map(char_widths[font].get, s, repeat(other_width))) * \
+        size / 1000
+
+
+# breaks `s` into lines at spaces, so that each line fits in `width` if it
+#   can; a single word that is too long gets a line of its own; each word is
+#   measured once
+def wrap_text(s, font, size, width):
+    if string_width(s, font, size) <= width:
+        return [s]
+
+    space = string_width(" ", font, size)
+    lines = []
+    line = None
+    line_width = 0
+    for word in s.split():
+        word_width = string_width(word, font, size)
+        if line is not None and line_width + space + word_width <= width:
+            line += " " + word
+            line_width += space + word_width
+        else:
+            if line is not None:
+                lines.append(line)
+            line, line_width = word, word_width
+    if line is not None:
+        lines.append(line)
+    return lines or [""]
+
+
+# escapes the characters with a meaning in a PDF string
+pdf_escapes = str.maketrans({"\\": "\\\\", "(": "\\(", ")": "\\)"})
+
+
+def pdf_string(s):
+    return "(" + s.translate(pdf_escapes) + ")"
+
+
+############
+## Labels ##
+############
+
+
+# the operators of a label around the organization name, as (head, tail)
+#   strings: the head is the box, the underline and the title, and the tail
+#   is the count lines, with a %d per count; they only depend on the label
+#   type, where the label is and how many lines the name takes
+def label_template(x, y, label_type, name_lines):
+    heading_font, heading_size, heading_leading = heading_style
+    count_font, count_size, count_leading = count_style
+    count_lines = len(label_type["lines"])
+
+    # the block runs from the ascent of the title down to the descent of the
+    #   last line, and is centered in the box
+    last_size = count_size if count_lines else heading_size
+    height = font_ascent * heading_size + font_descent * last_size + \
+        heading_leading * name_lines + count_leading * count_lines
+    left = x * inch
+    bottom = page_height - y * inch - box_height
+    text_left = left + box_rule + pad_x
+    baseline = bottom + (box_height + height) / 2 - \
+        font_ascent * heading_size
+    underline_y = baseline - underline_offset
+    title_width = string_width(label_type["title"], heading_font,
+                               heading_size)
+
+    head = [
+        "%.2f w %.2f %.2f %.2f %.2f re S" % (box_rule, left, bottom,
+                                             box_width, box_height),
+        "%.2f w %.2f %.2f m %.2f %.2f l S" % (underline_rule, text_left,
+                                              underline_y,
+                                              text_left + title_width,
+                                              underline_y),
+        "BT /%s %d Tf %.2f %.2f Td %s Tj" % (heading_font, heading_size,
+                                             text_left, baseline,
+                                             pdf_string(label_type["title"]))
+    ]
+    tail = ["/%s %d Tf" % (count_font, count_size)]
+    tail += ["0 -%d Td %s Tj" % (count_leading,
+                                 pdf_string(caption.replace("%", "%%") +
+                                            ": %d"))
+             for caption, _ in label_type["lines"]]
+    tail.append("ET")
+    return "\n".join(head), "\n" + "\n".join(tail)
+
+
+# the operators drawing one label whose top left corner is at (x, y) inches
+#   from the top left of the page; the lines of text are one text object,
+#   each placed relative to the line above it
+def label_operators(x, y, label_type, order, templates):
+    heading_font, heading_size, heading_leading = heading_style
+    names = wrap_text(curly_quotes(order["orgname"]), heading_font,
+                      heading_size, text_width)
+
+    key = (x, y, len(names))
+    if key not in templates:
+        templates[key] = label_template(x, y, label_type, len(names))
+    head, tail = templates[key]
+
+    counts = order["counts"]
+    return head + "".join("\n0 -%d Td %s Tj" % (heading_leading,
+                                                 pdf_string(line))
+                          for line in names) + \
+        tail % tuple(counts[x] for _, x in label_type["lines"])
+
+
+# collects one label type's pages; it takes the place of a LaTeX output
+#   file in `LabelSheet`
+class PdfLabels:
+    def __init__(self):
+        self.pages = []
+        self.templates = {}
+
+    def flush(self):
+        self.pages.append([])
+
+    def label(self, x, y, label_type, order):
+        if not self.pages:
+            self.flush()
+        self.pages[-1].append(label_operators(x, y, label_type, order,
+                                              self.templates))
+
+
+#########
+## PDF ##
+#########
+
+
+# `pages` holds the operators of each page, which are encoded as WinAnsi
+def write_pdf(pages, path):
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+    ]
+    font_refs = []
+    for name, font in sorted(fonts.items()):
+        objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /%s "
+                       b"/Encoding /WinAnsiEncoding >>" % font.encode())
+        font_refs.append(b"/%s %d 0 R" % (name.encode(), len(objects)))
+    resources = b"<< /Font << " + b" ".join(font_refs) + b" >> >>"
+
+    page_refs = []
+    for page in pages or [[]]:
+        content = zlib.compress("\n".join(page).encode("cp1252", "replace"),
+                                compress_level)
+        objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" %
+                       len(content) + content + b"\nendstream")
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+                       b"/Resources %s /Contents %d 0 R >>" %
+                       (page_width, page_height, resources, len(objects)))
+        page_refs.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [" + b" ".join(page_refs) + \
+        b"] /Count %d >>" % len(page_refs)
+
+    data = [b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"]
+    offsets = []
+    position = len(data[0])
+    for number, body in enumerate(objects, 1):
+        chunk = b"%d 0 obj\n" % number + body + b"\nendobj\n"
+        offsets.append(position)
+        data.append(chunk)
+        position += len(chunk)
+
+    data.append(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    data.extend(b"%010d 00000 n \n" % x for x in offsets)
+    data.append(b"trailer\n<< /Size %d /Root 1 0 R >>\n" % (len(objects) + 1))
+    data.append(b"startxref\n%d\n%%%%EOF\n" % position)
+
+    with open(path, "wb") as file:
+        file.write(b"".join(data))
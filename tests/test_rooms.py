@@ -0,0 +1,166 @@
+import csv
+import hashlib
+import os
+import random
+import re
+import sys
+
+import pytest
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ["", "assign-rooms", "generate-orders"]:
+    sys.path.insert(0, os.path.join(root, directory))
+
+from assign_rooms import Team, compute_assignments, orgs_file_to_list, \
+    powerindices_file_to_object, room_assignment_headers, \
+    rooms_file_to_list, teams_file_to_list
+from bench_rooms import generate_tournament, write_tournament
+from generate_orders import count_columns, orders_file_to_object, \
+    write_labels
+from pdf_orders import write_pdf
+from validate_rooms import validate_assignments
+
+
+##############
+## Fixtures ##
+##############
+
+
+# the greedy rows of `tournament`, hashed; if a change to the greedy passes
+#   is meant to move teams, check the new output and update this
+greedy_digest = \
+    "9e1b2532e12e440a93a6e2678a77ccb6dbc0af2466a6d1725210996c2a1692a4"
+
+
+# a generated tournament of about 300 teams, parsed as the scripts do
+@pytest.fixture(scope="module")
+def tournament(tmp_path_factory):
+    generated = generate_tournament(300, [35, 25, 15, 12, 8, 5], 0.05, 0.3,
+                                    random.Random("test_rooms"))
+    paths = write_tournament(generated, str(tmp_path_factory.mktemp("t")))
+    return {
+        "teams": teams_file_to_list(paths["teams"]),
+        "orgs": orgs_file_to_list(paths["orgs"]),
+        "powerindices": powerindices_file_to_object(paths["powerindices"]),
+        "rooms": rooms_file_to_list(paths["rooms"]),
+        "indiv_room": generated["indiv_room"]
+    }
+
+
+def assign(tournament, teams=None, **options):
+    return compute_assignments(
+        teams if teams is not None else tournament["teams"],
+        tournament["orgs"], tournament["powerindices"], tournament["rooms"],
+        "feb", tournament["indiv_room"], **options)
+
+
+# the rows as they are read back from `room_assignments.csv`
+def row_dicts(rows):
+    return [dict(zip(room_assignment_headers,
+                     ["" if x is None else str(x) for x in row]))
+            for row in rows]
+
+
+def violations(tournament, rows, teams=None):
+    return validate_assignments(
+        row_dicts(rows), teams if teams is not None else tournament["teams"],
+        tournament["orgs"], tournament["powerindices"], tournament["rooms"],
+        tournament["indiv_room"])
+
+
+#############
+## Engines ##
+#############
+
+
+@pytest.mark.parametrize("options", [
+    {"engine": "greedy"},
+    {"engine": "flow", "budget": 30},
+    {"engine": "partition", "workers": 2},
+    {"engine": "greedy", "local_search": 0.2, "restarts": 2, "workers": 1}
+])
+def test_engines_pass_validation(tournament, options):
+    assignments = assign(tournament, **options)
+    assert len(assignments["rows"]) == len(tournament["teams"])
+    assert violations(tournament, assignments["rows"]) == []
+
+
+def test_greedy_output_is_unchanged(tournament):
+    rows = assign(tournament)["rows"]
+    digest = hashlib.sha256(repr(rows).encode()).hexdigest()
+    assert digest == greedy_digest
+
+
+############
+## Repair ##
+############
+
+
+def test_repair_only_touches_the_changed_organizations(tournament):
+    rows = assign(tournament)["rows"]
+    previous = {int(x["teamid"]): x for x in row_dicts(rows)}
+
+    # one team withdraws and one registers late, in another organization
+    org_teams = {}
+    for team in tournament["teams"]:
+        org_teams.setdefault(team.orgid, []).append(team)
+    withdrawn_org, late_org = [x for x, teams in sorted(org_teams.items())
+                               if x != 1 and len(teams) > 1][:2]
+    withdrawn = org_teams[withdrawn_org][0]
+    late = Team(late_org, max(previous) + 1, "Late Team", "LT")
+    teams = [x for x in tournament["teams"] if x is not withdrawn] + [late]
+
+    assignments = assign(tournament, teams, previous=previous)
+    assert violations(tournament, assignments["rows"], teams) == []
+
+    diff = assignments["diff"]
+    assert ["removed", str(withdrawn.teamid)] in \
+        [[x[0], x[2]] for x in diff]
+    assert ["added", late.teamid] in [[x[0], x[2]] for x in diff]
+
+    # nothing else moves, the individuals included
+    assert {int(x[1]) for x in diff} <= {withdrawn_org, late_org}
+
+
+#########
+## PDF ##
+#########
+
+
+def check_pdf(path):
+    with open(path, "rb") as file:
+        data = file.read()
+
+    start = int(re.search(rb"startxref\n(\d+)\n%%EOF\n$", data).group(1))
+    assert data[start:start + 5] == b"xref\n"
+    count = int(re.match(rb"xref\n0 (\d+)\n", data[start:]).group(1))
+    offsets = re.findall(rb"(\d{10}) 00000 n \n", data[start:])
+    assert len(offsets) == count - 1
+    for number, offset in enumerate(offsets, 1):
+        assert data[int(offset):].startswith(b"%d 0 obj\n" % number)
+
+    return int(re.search(rb"/Count (\d+)", data).group(1))
+
+
+def test_pdf_xref_offsets(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    columns = ["xs", "s", "m", "l", "xl", "xxl", "cheese", "pepperoni"]
+    with open("orders.csv", "w") as file:
+        writer = csv.writer(file)
+        writer.writerow(["orgid", "orgname"] + columns)
+        for orgid in range(25):
+            writer.writerow([orgid, "Organization é & \"" + str(orgid) +
+                             "\" (with a long name that has to wrap)"] +
+                            [orgid % 3, 1, 0, 2, 0, 1, orgid % 2, 1])
+
+    names = ["shirt", "pizza"]
+    write_labels(orders_file_to_object("orders.csv", count_columns(names)),
+                 names, "pdf")
+    # 25 shirt labels on 3 pages, then 25 pizza labels on 3 more
+    assert check_pdf("orders.pdf") == 6
+
+
+def test_pdf_without_labels_has_a_page(tmp_path):
+    path = str(tmp_path / "empty.pdf")
+    write_pdf([], path)
+    assert check_pdf(path) == 1